@@ -0,0 +1,66 @@
+"""
+批量写接口与逐条调用的对比：N 次 POST /grade + N 次 DELETE /grade/{id}
+与 一次 POST /grade/batch 新增 + 一次 POST /grade/batch 删除。
+
+用法（先启动服务，准备一个测试班级）:
+    python -m benchmark.batch_grades --class-id <id> --size 45
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+BASE_URL = "http://127.0.0.1:8083/grade"
+
+
+def _items(class_id: str, size: int, exam: str) -> list:
+    return [
+        {"name": f"bench-{i:04d}", "class_id": class_id, "year": "2099", "semester": "1", "exam": exam,
+         "score": 60 + i % 40}
+        for i in range(size)
+    ]
+
+
+async def single_calls(client: httpx.AsyncClient, url: str, class_id: str, size: int) -> float:
+    start = time.perf_counter()
+    ids = []
+    for item in _items(class_id, size, "1"):
+        resp = await client.post(url, json=item)
+        resp.raise_for_status()
+        ids.append(resp.json()["data"]["id"])
+    for grade_id in ids:
+        (await client.delete(f"{url}/{grade_id}")).raise_for_status()
+    return time.perf_counter() - start
+
+
+async def batch_calls(client: httpx.AsyncClient, url: str, class_id: str, size: int) -> float:
+    start = time.perf_counter()
+    resp = await client.post(f"{url}/batch", json={"upserts": _items(class_id, size, "2")})
+    resp.raise_for_status()
+    ids = [item["id"] for item in resp.json()["data"]["upserts"]]
+    (await client.post(f"{url}/batch", json={"deletes": ids})).raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(url: str, class_id: str, size: int):
+    async with httpx.AsyncClient(timeout=120) as client:
+        single = await single_calls(client, url, class_id, size)
+        batch = await batch_calls(client, url, class_id, size)
+    print(f"{size} grades created and deleted")
+    print(f"single calls: {single * 1000:9.1f} ms ({size * 2} requests)")
+    print(f"batch calls:  {batch * 1000:9.1f} ms (2 requests)")
+    print(f"speedup:      {single / batch:9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch grade write benchmark")
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--class-id", required=True)
+    parser.add_argument("--size", type=int, default=45)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.class_id, args.size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+并发吞吐压测：对运行中的服务同时发起大量请求，统计吞吐与延迟。
+
+用法（先启动服务，分别在改造前后的代码上各跑一次对比）:
+    python -m benchmark.concurrency --url http://127.0.0.1:8083/grade --concurrency 50 --requests 1000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _worker(client: httpx.AsyncClient, url: str, params: dict, queue: asyncio.Queue, latencies: list,
+                  errors: list):
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        start = time.perf_counter()
+        try:
+            resp = await client.get(url, params=params)
+            if resp.status_code >= 400:
+                errors.append(resp.status_code)
+        except httpx.HTTPError as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url: str, concurrency: int, total: int, params: dict) -> dict:
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    latencies = []
+    errors = []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[_worker(client, url, params, queue, latencies, errors) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0,
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "latency_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2) if latencies else None,
+        "latency_max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent request throughput benchmark")
+    parser.add_argument("--url", default="http://127.0.0.1:8083/grade")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--param", action="append", default=[], help="query param, e.g. --param page_size=100")
+    args = parser.parse_args()
+
+    params = dict(p.split("=", 1) for p in args.param)
+    result = asyncio.run(run(args.url, args.concurrency, args.requests, params))
+    for key, value in result.items():
+        print(f"{key:>16}: {value}")
+
+
+if __name__ == '__main__':
+    main()
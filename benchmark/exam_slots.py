@@ -0,0 +1,56 @@
+"""
+成绩对比场次填充的微基准：旧的 res × current × previous 嵌套循环 与 字典分桶填充 对比。
+
+用法:
+    python -m benchmark.exam_slots --slots 4 --number 20000
+"""
+import argparse
+import random
+import timeit
+
+from common.exam_slots import fill_compare_slots
+from model.grade_model import StudentGradeCompareModel, StudentGradeModel
+
+
+def legacy_merge(current_rows, previous_rows, slots):
+    current_data = [StudentGradeModel(score=score, exam=exam) for exam, score in current_rows]
+    previous_data = [StudentGradeModel(score=score, exam=exam) for exam, score in previous_rows]
+    res = [StudentGradeCompareModel(current_score=None, previous_score=None, exam=str(i + 1)) for i in range(slots)]
+    for item in res:
+        for item1 in current_data:
+            if item.exam == item1.exam:
+                item.current_score = item1.score
+        for item2 in previous_data:
+            if item.exam == item2.exam:
+                item.previous_score = item2.score
+    return res
+
+
+def bucket_merge(rows, current_key, previous_key, slots):
+    buckets = {current_key: {}, previous_key: {}}
+    for year, semester, exam, score in rows:
+        buckets[(year, semester)][exam] = score
+    return fill_compare_slots(buckets[current_key], buckets[previous_key], slots)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exam slot merge micro-benchmark")
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    current_rows = [(str(i + 1), random.uniform(40, 100)) for i in range(args.slots)]
+    previous_rows = [(str(i + 1), random.uniform(40, 100)) for i in range(args.slots)]
+    rows = [('2024', '1', exam, score) for exam, score in current_rows] + \
+           [('2023', '2', exam, score) for exam, score in previous_rows]
+
+    legacy = timeit.timeit(lambda: legacy_merge(current_rows, previous_rows, args.slots), number=args.number)
+    bucket = timeit.timeit(lambda: bucket_merge(rows, ('2024', '1'), ('2023', '2'), args.slots), number=args.number)
+
+    print(f"slots={args.slots} iterations={args.number}")
+    print(f"legacy nested loops: {legacy / args.number * 1e6:8.2f} us/call")
+    print(f"dict bucket fill:    {bucket / args.number * 1e6:8.2f} us/call")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+对各接口的典型查询执行 EXPLAIN，检查是否命中索引（迁移后运行）。
+
+用法:
+    python -m benchmark.explain_check
+返回码非 0 表示有查询在热点表上做了全表扫描。
+"""
+import asyncio
+import sys
+
+from sqlalchemy import desc, select, text
+from sqlalchemy.dialects import mysql
+
+from db.db import engine, dispose_engine
+from model.db_model import DbGrade, DbStudent, DbTbClass
+
+SAMPLE = {"class_id": "class-1", "student_id": "student-1", "year": "2024", "semester": "1", "exam": "1",
+          "name": "王若宸"}
+
+
+def _grade_list():
+    return (
+        select(DbGrade.id, DbGrade.score, DbStudent.name, DbTbClass.name)
+        .join(DbStudent, DbGrade.student_id == DbStudent.id)
+        .join(DbTbClass, DbGrade.class_id == DbTbClass.id)
+    )
+
+
+# (接口, 查询, 必须走索引的表)
+CHECKS = [
+    ("get_grades (class/exam filter)",
+     _grade_list().where(DbGrade.class_id == SAMPLE["class_id"], DbGrade.year == SAMPLE["year"],
+                         DbGrade.semester == SAMPLE["semester"], DbGrade.exam == SAMPLE["exam"])
+     .order_by(desc(DbGrade.date), desc(DbGrade.id)).limit(10),
+     "grade"),
+    ("get_grades (no filter, sort by date)",
+     _grade_list().order_by(desc(DbGrade.date), desc(DbGrade.id)).limit(10),
+     "grade"),
+    ("get_student_grades",
+     select(DbGrade).where(DbGrade.student_id == SAMPLE["student_id"], DbGrade.year == SAMPLE["year"],
+                           DbGrade.semester == SAMPLE["semester"]),
+     "grade"),
+    ("create_grade / import_grades student lookup",
+     select(DbStudent.id).where(DbStudent.class_id == SAMPLE["class_id"], DbStudent.name == SAMPLE["name"]),
+     "student"),
+    ("get_students (sort by created_time)",
+     select(DbStudent.id, DbStudent.name).order_by(desc(DbStudent.created_time), desc(DbStudent.id)).limit(10),
+     "student"),
+]
+
+
+def _compile(stmt) -> str:
+    return str(stmt.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def run() -> bool:
+    ok = True
+    async with engine.connect() as conn:
+        for name, stmt, table in CHECKS:
+            result = await conn.execute(text("EXPLAIN " + _compile(stmt)))
+            rows = [row._mapping for row in result]
+            plan = [r for r in rows if r["table"] == table]
+            # 排序走索引时 key 不为空；type 为 ALL 表示全表扫描
+            passed = bool(plan) and all(r["key"] and r["type"] != "ALL" for r in plan)
+            ok = ok and passed
+            keys = ", ".join(str(r["key"]) for r in plan)
+            print(f"[{'OK' if passed else 'FAIL'}] {name}: {table} -> {keys}")
+    return ok
+
+
+async def _main() -> int:
+    try:
+        return 0 if await run() else 1
+    finally:
+        await dispose_engine()
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(_main()))
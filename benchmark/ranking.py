@@ -0,0 +1,42 @@
+"""
+排名接口压测：分别测班级内排名、全年级排名、Top-N 和单个学生查询的延迟。
+
+用法（先用较大的数据量导入一个年级的成绩并启动服务）:
+    python -m benchmark.ranking --year 2024 --semester 1 --exam 1 --student-id <id>
+"""
+import argparse
+import asyncio
+
+from benchmark.concurrency import run
+
+BASE_URL = "http://127.0.0.1:8083/grade/ranking"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ranking endpoint benchmark")
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--year", required=True)
+    parser.add_argument("--semester", required=True)
+    parser.add_argument("--exam", required=True)
+    parser.add_argument("--student-id")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    base = {"year": args.year, "semester": args.semester, "exam": args.exam}
+    scenarios = [
+        ("class ranking", {**base, "scope": "class"}),
+        ("grade-level ranking", {**base, "scope": "all"}),
+        ("grade-level top 10", {**base, "scope": "all", "top_n": 10}),
+    ]
+    if args.student_id:
+        scenarios.append(("single student", {**base, "scope": "all", "student_id": args.student_id}))
+
+    for name, params in scenarios:
+        result = asyncio.run(run(args.url, args.concurrency, args.requests, params))
+        print(f"{name:<22} rps={result['throughput_rps']:<8} p50={result['latency_p50_ms']}ms "
+              f"p95={result['latency_p95_ms']}ms errors={result['errors']}")
+
+
+if __name__ == '__main__':
+    main()
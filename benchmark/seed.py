@@ -0,0 +1,170 @@
+"""
+基准测试数据生成：按固定随机种子生成班级、学生和多学年成绩，同样的参数每次生成完全相同的数据。
+姓名由 common/demo.txt 中的姓和名组合而成。生成的班级 value 字段标记为 'benchmark'，--reset 只删除这些数据。
+
+用法（本地库，先执行 python -m db.migrations）:
+    python -m benchmark.seed --classes 2000 --students 100000 --start-year 2020 --years 5 --exams 10
+    python -m benchmark.seed --reset
+按上面的参数共生成 100000 × 5 × 2 × 10 = 1000 万条成绩。生成完会写出 benchmark/results/dataset.json，
+供 benchmark.suite 取样本 id。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from common.grade_stats import FULL_SCORE
+from common.grade_summary import rebuild_all
+from db.db import dispose_engine, engine
+from model.db_model import DbGrade, DbStudent, DbTbClass
+
+BENCHMARK_MARK = "benchmark"
+DEMO_NAMES = os.path.join(os.path.dirname(__file__), "..", "common", "demo.txt")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DATASET_FILE = os.path.join(RESULTS_DIR, "dataset.json")
+# 每条 INSERT 的行数
+INSERT_BATCH = 5000
+
+
+def load_name_parts() -> tuple:
+    with open(DEMO_NAMES, encoding='utf-8') as f:
+        names = [line.strip() for line in f if line.strip()]
+    surnames = sorted({name[0] for name in names})
+    given_names = sorted({name[1:] for name in names if len(name) > 1})
+    return surnames, given_names
+
+
+class Generator:
+    """所有 id、姓名、分数都来自同一个 Random，保证可复现"""
+
+    def __init__(self, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.surnames, self.given_names = load_name_parts()
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def name(self) -> str:
+        return self.rng.choice(self.surnames) + self.rng.choice(self.given_names)
+
+    def score(self, ability: float) -> float:
+        # 每个学生有一个基础水平，每场考试在其附近波动
+        return round(min(max(self.rng.gauss(ability, 8), 0), FULL_SCORE), 1)
+
+
+async def _insert_batches(conn, model, rows: list):
+    for i in range(0, len(rows), INSERT_BATCH):
+        await conn.execute(insert(model), rows[i:i + INSERT_BATCH])
+
+
+async def reset():
+    async with engine.begin() as conn:
+        class_ids = select(DbTbClass.id).where(DbTbClass.value == BENCHMARK_MARK)
+        await conn.execute(delete(DbGrade).where(DbGrade.class_id.in_(class_ids)))
+        await conn.execute(delete(DbStudent).where(DbStudent.class_id.in_(class_ids)))
+        await conn.execute(delete(DbTbClass).where(DbTbClass.value == BENCHMARK_MARK))
+        await rebuild_all(conn)
+
+
+async def seed(classes: int, students: int, start_year: int, years: int, exams: int, seed_value: int) -> dict:
+    gen = Generator(seed_value)
+    started = time.perf_counter()
+    semesters = [(str(start_year + y), str(s)) for y in range(years) for s in (1, 2)]
+    created = datetime(start_year, 9, 1)
+
+    class_rows = [{"id": gen.uuid(), "name": f"基准{i + 1:04d}班", "value": BENCHMARK_MARK} for i in range(classes)]
+    grade_count = 0
+    sample_students = []
+
+    async with engine.connect() as conn:
+        await conn.execute(insert(DbTbClass), class_rows)
+        await conn.commit()
+
+        # 学生按班级平均分配，逐个班级生成写入并提交，内存和事务只包含一个班级的数据
+        per_class, extra = divmod(students, classes)
+        for class_index, klass in enumerate(class_rows):
+            count = per_class + (1 if class_index < extra else 0)
+            student_rows = [
+                {"id": gen.uuid(), "name": gen.name(), "class_id": klass["id"],
+                 "created_time": created + timedelta(seconds=class_index * per_class + i)}
+                for i in range(count)
+            ]
+            await conn.execute(insert(DbStudent), student_rows)
+
+            grade_rows = []
+            for student in student_rows:
+                ability = gen.rng.uniform(45, 95)
+                for year, semester in semesters:
+                    exam_date = datetime(int(year), 3 if semester == '2' else 9, 1)
+                    for exam in range(1, exams + 1):
+                        grade_rows.append({
+                            "id": gen.uuid(),
+                            "student_id": student["id"],
+                            "class_id": klass["id"],
+                            "score": gen.score(ability),
+                            "year": year,
+                            "semester": semester,
+                            "exam": str(exam),
+                            "date": exam_date + timedelta(days=exam * 14, seconds=len(grade_rows)),
+                        })
+            await _insert_batches(conn, DbGrade, grade_rows)
+            await conn.commit()
+            grade_count += len(grade_rows)
+            if student_rows and len(sample_students) < 20:
+                student = student_rows[0]
+                sample_students.append({"id": student["id"], "name": student["name"], "class_id": klass["id"]})
+            print(f"\rclass {class_index + 1}/{classes}, {grade_count} grades", end="", flush=True)
+
+        print()
+        await rebuild_all(conn)
+        await conn.commit()
+
+    dataset = {
+        "seed": seed_value,
+        "classes": classes,
+        "students": students,
+        "grades": grade_count,
+        "start_year": start_year,
+        "years": years,
+        "exams": exams,
+        "semesters": [list(s) for s in semesters],
+        "sample_class_ids": [klass["id"] for klass in class_rows[:20]],
+        "sample_students": sample_students,
+        "elapsed_s": round(time.perf_counter() - started, 1),
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(DATASET_FILE, 'w', encoding='utf-8') as f:
+        json.dump(dataset, f, ensure_ascii=False, indent=2)
+    return dataset
+
+
+async def _main(args):
+    try:
+        if args.reset:
+            await reset()
+            print("benchmark data removed")
+            return
+        await reset()
+        dataset = await seed(args.classes, args.students, args.start_year, args.years, args.exams, args.seed)
+        print(f"{dataset['classes']} classes, {dataset['students']} students, {dataset['grades']} grades "
+              f"in {dataset['elapsed_s']}s -> {DATASET_FILE}")
+    finally:
+        await dispose_engine()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic dataset for benchmarks")
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--start-year", type=int, default=2020)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--exams", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="only remove previously generated benchmark data")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""
+列表接口序列化开销对比：同样的 100 行数据，
+    pydantic  每行一个 GradeResponse，包在 APIResponse 里由 FastAPI 校验并 jsonable_encoder 编码（改造前）
+    fast      结果行直接映射为 dict，api_response 用 orjson 编码（改造后）
+不连数据库，只比较每个请求在进程内消耗的 CPU 时间，并校验两者输出的 JSON 一致。
+
+用法:
+    python -m benchmark.serialization --rows 100 --requests 2000
+"""
+import argparse
+import json
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.json_response import api_response, orjson
+from model.grade_model import GradeResponse
+from model.response import APIResponse
+
+Row = namedtuple('Row', 'grade_id score year semester exam date student_name class_name class_id')
+
+
+def _rows(count: int) -> list:
+    start = datetime(2024, 9, 1, 8, 0)
+    return [
+        Row(f"grade-{i:06d}", float(60 + i % 40), "2024", "1", str(i % 6 + 1), start + timedelta(minutes=i),
+            f"学生{i:04d}", "三年级二班", "class-0001")
+        for i in range(count)
+    ]
+
+
+def _pagination(count: int) -> dict:
+    return {"total_count": count * 20, "page": 1, "page_size": count}
+
+
+def create_app(rows: list) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/pydantic", response_model=APIResponse)
+    async def pydantic_rows():
+        data = [
+            GradeResponse(id=row.grade_id, score=row.score, year=row.year, semester=row.semester, exam=row.exam,
+                          date=row.date, student_name=row.student_name, class_name=row.class_name,
+                          class_id=row.class_id)
+            for row in rows
+        ]
+        return APIResponse(status=True, data={"data": data, "pagination": _pagination(len(rows))},
+                           message="Success", code=200)
+
+    @app.get("/fast", response_model=APIResponse)
+    async def fast_rows():
+        data = [
+            {"id": row.grade_id, "student_name": row.student_name, "year": row.year, "semester": row.semester,
+             "exam": row.exam, "class_name": row.class_name, "class_id": row.class_id, "score": row.score}
+            for row in rows
+        ]
+        return api_response({"data": data, "pagination": _pagination(len(rows))})
+
+    return app
+
+
+def _measure(client: TestClient, path: str, requests: int) -> float:
+    for _ in range(min(requests, 50)):
+        client.get(path)
+    start = time.process_time()
+    for _ in range(requests):
+        client.get(path)
+    return (time.process_time() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List endpoint serialization benchmark")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    client = TestClient(create_app(_rows(args.rows)))
+    slow_body = client.get("/pydantic").json()
+    fast_body = client.get("/fast").json()
+    assert json.dumps(slow_body, sort_keys=True) == json.dumps(fast_body, sort_keys=True), "JSON shape differs"
+
+    # 两条路径都包含 TestClient 的请求开销，差值即序列化节省的 CPU
+    slow = _measure(client, "/pydantic", args.requests)
+    fast = _measure(client, "/fast", args.requests)
+    print(f"{args.rows} rows per response, {args.requests} requests, orjson={'yes' if orjson else 'no'}")
+    print(f"pydantic: {slow * 1e6:9.1f} us CPU/request")
+    print(f"fast:     {fast * 1e6:9.1f} us CPU/request")
+    print(f"saved:    {(slow - fast) * 1e6:9.1f} us CPU/request ({(1 - fast / slow) * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
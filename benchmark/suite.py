@@ -0,0 +1,177 @@
+"""
+基准测试套件：在 benchmark.seed 生成的数据上跑固定的场景，输出可对比的 JSON 报告。
+
+用法:
+    python -m benchmark.seed --students 100000 ...          # 生成数据（相同参数数据相同）
+    CACHE_TTL=0 uvicorn main:app --port 8083                 # 重启服务；CACHE_TTL=0 时测的是不走缓存的查库路径
+    python -m benchmark.suite --label before                 # 改动前
+    python -m benchmark.suite --label after --compare before # 改动后，与 before 对比
+报告写在 benchmark/results/<label>.json，包含代码版本、数据集参数和每个场景的吞吐与延迟分位数。
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import subprocess
+import time
+from datetime import datetime
+
+import httpx
+
+from benchmark.concurrency import run
+from benchmark.seed import DATASET_FILE, RESULTS_DIR
+
+BASE_URL = "http://127.0.0.1:8083"
+# 导入场景每次轮询任务状态的间隔
+POLL_INTERVAL = 0.05
+# 对比时变化超过该比例才标出
+CHANGE_THRESHOLD = 0.05
+
+
+def read_scenarios(dataset: dict) -> list:
+    """(场景名, 路径, 查询参数)，全部从数据集的样本 id 派生，同一数据集上每次运行完全相同"""
+    class_id = dataset["sample_class_ids"][0]
+    student = dataset["sample_students"][0]
+    year, semester = dataset["semesters"][-1]
+    return [
+        ("grades: first page", "/grade", {"page_size": 100}),
+        ("grades: deep offset page", "/grade", {"page": 500, "page_size": 100, "with_total": "false"}),
+        ("grades: first cursor page", "/grade", {"page_size": 100, "cursor": ""}),
+        ("grades: by class and exam", "/grade", {"class_id": class_id, "year": year, "semester": semester,
+                                                 "exam": "1", "page_size": 100}),
+        ("grades: by name", "/grade", {"name": student["name"], "page_size": 100}),
+        ("students: first page", "/student", {"page_size": 100}),
+        ("students: by class", "/student", {"class_id": class_id, "page_size": 100}),
+        ("students: by name", "/student", {"name": student["name"][:1], "page_size": 100}),
+        ("student grades", f"/grade/get-student-grades/{student['id']}/{year}/{semester}", {}),
+        ("student compare grades", f"/grade/get-student-compare-grades/{student['id']}/{year}/{semester}", {}),
+    ]
+
+
+def _import_file(names: list, iteration: int) -> bytes:
+    # 同一文件以相同参数导入是幂等的（上传按 sha256 去重、任务按参数去重），每轮分数不同才会真正执行导入
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["姓名", "成绩"])
+    for i, name in enumerate(names):
+        writer.writerow([name, (i * 7 + iteration) % 101])
+    return buffer.getvalue().encode('utf-8')
+
+
+async def import_scenario(base_url: str, dataset: dict, rows: int, iterations: int) -> dict:
+    """上传 CSV、提交导入、轮询到任务结束，统计端到端耗时和服务端报告的导入速度"""
+    class_id = dataset["sample_class_ids"][-1]
+    year = str(dataset["start_year"] + dataset["years"])
+    names = [f"导入{i:05d}" for i in range(rows)]
+    latencies = []
+    rows_per_sec = []
+    errors = 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        for iteration in range(iterations):
+            start = time.perf_counter()
+            files = {"file": (f"bench-import-{iteration}.csv", _import_file(names, iteration), "text/csv")}
+            upload = (await client.post("/common/upload-file", files=files)).json()
+            payload = {"file_id": upload["data"]["file_id"], "class_id": class_id, "year": year, "semester": "1",
+                       "exam": "1"}
+            job = (await client.post("/grade/import-grades", json=payload)).json()["data"]
+            job_id = job["job_id"]
+            while job["status"] in ("pending", "running"):
+                await asyncio.sleep(POLL_INTERVAL)
+                job = (await client.get(f"/grade/import-jobs/{job_id}")).json()["data"]
+            latencies.append(time.perf_counter() - start)
+            if job["status"] != "succeeded":
+                errors += 1
+            elif job.get("rows_per_sec"):
+                rows_per_sec.append(job["rows_per_sec"])
+
+    latencies.sort()
+    return {
+        "requests": iterations,
+        "rows": rows,
+        "errors": errors,
+        "latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "latency_max_ms": round(latencies[-1] * 1000, 2),
+        "rows_per_sec": round(sum(rows_per_sec) / len(rows_per_sec), 1) if rows_per_sec else None,
+    }
+
+
+def _git_version() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_suite(base_url: str, dataset: dict, concurrency: int, requests: int, import_rows: int,
+                    import_iterations: int) -> dict:
+    results = {}
+    for name, path, params in read_scenarios(dataset):
+        # 先热身一轮，避免首次加载姓名索引、连接池建连计入结果
+        await run(base_url + path, 1, 5, params)
+        results[name] = await run(base_url + path, concurrency, requests, params)
+        print(f"{name:<28} rps={results[name]['throughput_rps']:<8} p50={results[name]['latency_p50_ms']}ms "
+              f"p95={results[name]['latency_p95_ms']}ms errors={results[name]['errors']}")
+    if import_iterations:
+        name = f"import grades ({import_rows} rows)"
+        results[name] = await import_scenario(base_url, dataset, import_rows, import_iterations)
+        print(f"{name:<28} p50={results[name]['latency_p50_ms']}ms rows/s={results[name]['rows_per_sec']} "
+              f"errors={results[name]['errors']}")
+    return results
+
+
+def compare(current: dict, baseline: dict):
+    print(f"\n{'scenario':<28} {'metric':<16} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        for metric in ("throughput_rps", "latency_p50_ms", "latency_p95_ms", "rows_per_sec"):
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            mark = " *" if abs(change) >= CHANGE_THRESHOLD else ""
+            print(f"{name:<28} {metric:<16} {old:>10} {new:>10} {change * 100:>+7.1f}%{mark}")
+    if baseline.get("dataset") != current.get("dataset"):
+        print("\nwarning: baseline was run on a different dataset, numbers are not comparable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark scenarios and write a comparable report")
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--label", default=datetime.now().strftime('%Y%m%d-%H%M%S'))
+    parser.add_argument("--compare", help="label of an earlier report to compare against")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--import-rows", type=int, default=5000)
+    parser.add_argument("--import-iterations", type=int, default=3, help="0 to skip the import scenario")
+    args = parser.parse_args()
+
+    with open(DATASET_FILE, encoding='utf-8') as f:
+        dataset = json.load(f)
+    scenarios = asyncio.run(run_suite(args.url, dataset, args.concurrency, args.requests, args.import_rows,
+                                      args.import_iterations))
+    report = {
+        "label": args.label,
+        "version": _git_version(),
+        "time": datetime.now().isoformat(timespec='seconds'),
+        "dataset": {key: dataset[key] for key in ("seed", "classes", "students", "grades", "years", "exams")},
+        "params": {"concurrency": args.concurrency, "requests": args.requests},
+        "scenarios": scenarios,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{args.label}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nreport written to {path}")
+
+    if args.compare:
+        with open(os.path.join(RESULTS_DIR, f"{args.compare}.json"), encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+查询结果缓存：默认进程内 LRU + TTL，设置 CACHE_BACKEND=redis 时使用 Redis（多 worker 共享）。
+
+缓存项按标签归组，写接口按 班级/学生 标签失效：
+    class:{class_id}   按班级过滤的列表、统计
+    class:*            未按班级过滤的列表（任何班级的写入都会失效）
+    student:{id}       单个学生的成绩
+    student:*          所有单个学生的成绩（批量导入时整体失效）
+
+每个标签还有一个数据版本号，失效时更新，用于生成 HTTP ETag。查询前先取版本号，写缓存时传入 versions，
+查询期间有写入（版本已变）时不缓存旧结果。ETag 另外带上按 CACHE_TTL 划分的时间段，
+最多 CACHE_TTL 秒后变化：内存后端的版本号只在本进程内更新，其他 worker 的写入、以及不经过 invalidate()
+的写入（汇总表重建、benchmark.seed、手工 SQL）都看不到，这样 304 的陈旧时间与查询缓存一样不超过 CACHE_TTL。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+from common.json_response import dumps
+from common.pagination import count_cache
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_TTL = int(os.getenv('CACHE_TTL', 60))
+CACHE_MAXSIZE = int(os.getenv('CACHE_MAXSIZE', 2048))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+ALL_CLASSES_TAG = "class:*"
+ALL_STUDENTS_TAG = "student:*"
+
+
+def cache_key(prefix: str, **params) -> str:
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return f"{prefix}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def class_tag(class_id: Optional[str]) -> str:
+    return f"class:{class_id}" if class_id else ALL_CLASSES_TAG
+
+
+def student_tags(student_id: str) -> list:
+    return [f"student:{student_id}", ALL_STUDENTS_TAG]
+
+
+class CacheStats:
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def snapshot(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class LRUCache:
+    """进程内 LRU 缓存，带过期时间和标签索引"""
+
+    def __init__(self, maxsize: int = CACHE_MAXSIZE, ttl: int = CACHE_TTL) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data = OrderedDict()
+        self._tags = {}
+        self._versions = {}
+        # 未写入过的标签使用进程启动时的版本，重启后旧 ETag 不会误命中
+        self._base_version = str(time.time_ns())
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] <= time.monotonic():
+                if item is not None:
+                    self._drop(key)
+                    self.stats.evictions += 1
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return item[0]
+
+    async def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl: Optional[int] = None,
+                  versions: Optional[list] = None):
+        tags = tuple(tags)
+        with self._lock:
+            if versions is not None and [self._versions.get(tag, self._base_version) for tag in tags] != versions:
+                return
+            self._drop(key)
+            self._data[key] = (value, time.monotonic() + (ttl or self.ttl), tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+                self.stats.evictions += 1
+
+    async def get_versions(self, tags: Iterable[str]) -> list:
+        with self._lock:
+            return [self._versions.get(tag, self._base_version) for tag in tags]
+
+    async def invalidate_tags(self, tags: Iterable[str]):
+        with self._lock:
+            version = str(time.time_ns())
+            for tag in set(tags):
+                self._versions[tag] = version
+                for key in self._tags.pop(tag, set()):
+                    if key in self._data:
+                        self._drop(key)
+                        self.stats.invalidations += 1
+
+    async def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def _drop(self, key: str):
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        for tag in item[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCache:
+    """
+    Redis 缓存，client 为 redis.asyncio 兼容的客户端（测试时可换成 fakeredis）。
+    标签用 Redis set 记录所属的 key；淘汰由 Redis 的过期和内存策略负责。
+    值以 JSON 存储（Pydantic 模型按 model_dump 序列化），读出的是 dict/list，不依赖代码版本，也不会反序列化出任意对象。
+    """
+
+    def __init__(self, client, ttl: int = CACHE_TTL, prefix: str = "grade-cache:") -> None:
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        value = None
+        if raw is not None:
+            try:
+                value = json.loads(raw)
+            except ValueError:  # 旧版本写入的非 JSON 值按未命中处理，随后被覆盖
+                raw = None
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl: Optional[int] = None,
+                  versions: Optional[list] = None):
+        tags = list(tags)
+        if versions is not None and await self.get_versions(tags) != versions:
+            return
+        ttl = ttl or self.ttl
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, dumps(value), ex=ttl)
+        for tag in tags:
+            pipe.sadd(self.prefix + "tag:" + tag, key)
+            pipe.expire(self.prefix + "tag:" + tag, ttl)
+        await pipe.execute()
+        # 检查与写入之间发生的失效可能已经清理过标签集合，写入后再核对一次，版本变了就删掉刚写的值
+        if versions is not None and await self.get_versions(tags) != versions:
+            await self.client.delete(self.prefix + key)
+
+    async def get_versions(self, tags: Iterable[str]) -> list:
+        tags = list(tags)
+        keys = [self.prefix + "version:" + tag for tag in tags]
+        versions = await self.client.mget(keys)
+        for i, version in enumerate(versions):
+            if version is None:
+                # 首次使用的标签写入一个时间戳版本，各 worker 共用
+                await self.client.set(keys[i], str(time.time_ns()), nx=True)
+                version = await self.client.get(keys[i])
+            versions[i] = version.decode() if isinstance(version, bytes) else version
+        return versions
+
+    async def invalidate_tags(self, tags: Iterable[str]):
+        version = str(time.time_ns())
+        for tag in set(tags):
+            await self.client.set(self.prefix + "version:" + tag, version)
+            tag_key = self.prefix + "tag:" + tag
+            keys = await self.client.smembers(tag_key)
+            if keys:
+                keys = [k.decode() if isinstance(k, bytes) else k for k in keys]
+                self.stats.invalidations += await self.client.delete(*[self.prefix + k for k in keys])
+            await self.client.delete(tag_key)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+
+def create_cache():
+    if CACHE_BACKEND == 'redis':
+        from redis import asyncio as aioredis
+
+        return RedisCache(aioredis.from_url(REDIS_URL))
+    return LRUCache()
+
+
+query_cache = create_cache()
+
+
+async def etag_for(key: str, tags: Iterable[str]) -> Optional[str]:
+    """由查询 key、相关标签的数据版本和当前时间段生成弱 ETag，数据未变时不需要查库就能比较；CACHE_TTL=0 时不生成"""
+    if CACHE_TTL <= 0:
+        return None
+    tags = sorted(tags)
+    versions = await query_cache.get_versions(tags)
+    epoch = int(time.time() // CACHE_TTL)
+    raw = f"{key}|{epoch}|" + ",".join(f"{tag}={version}" for tag, version in zip(tags, versions))
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+async def invalidate(class_ids: Iterable[Optional[str]] = (), student_ids: Iterable[str] = (),
+                     all_students: bool = False):
+    """写入成绩/学生后调用，失效涉及的班级、学生以及不分班级的列表缓存"""
+    tags = {ALL_CLASSES_TAG}
+    tags.update(class_tag(class_id) for class_id in class_ids if class_id)
+    tags.update(f"student:{student_id}" for student_id in student_ids if student_id)
+    if all_students:
+        tags.add(ALL_STUDENTS_TAG)
+    await query_cache.invalidate_tags(tags)
+    # 总数缓存按查询条件而不是标签存放，任何写入都整体清空（只影响本进程，其他 worker 最多滞后 COUNT_CACHE_TTL）
+    count_cache.clear()
@@ -0,0 +1,42 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+from model.grade_model import StudentGradeCompareModel, StudentGradeModel
+
+# 每学期固定的考试场次，前端按 exam = '1'..'N' 排布
+EXAM_SLOTS = int(os.getenv('EXAM_SLOTS', 4))
+# 批量趋势查询最多跨越的学期数
+MAX_SEMESTERS = 20
+
+
+def previous_semester(year: str, semester: str) -> Tuple[str, str]:
+    if semester == '1':
+        return str(int(year) - 1), '2'
+    return year, '1'
+
+
+def semester_range(start_year: str, start_semester: str, end_year: str, end_semester: str) -> List[Tuple[str, str]]:
+    """按时间顺序列出 [起始学期, 结束学期] 之间的所有 (学年, 学期)"""
+    semesters = []
+    year, semester = int(start_year), int(start_semester)
+    end = (int(end_year), int(end_semester))
+    while (year, semester) <= end:
+        semesters.append((str(year), str(semester)))
+        if len(semesters) > MAX_SEMESTERS:
+            raise ValueError(f"Semester range too long, at most {MAX_SEMESTERS} semesters")
+        year, semester = (year, 2) if semester == 1 else (year + 1, 1)
+    return semesters
+
+
+def fill_slots(scores: Dict[str, Optional[float]], slots: int = EXAM_SLOTS) -> List[StudentGradeModel]:
+    """按 exam -> score 字典填充固定场次，没有成绩的场次为 None"""
+    return [StudentGradeModel(exam=str(i + 1), score=scores.get(str(i + 1))) for i in range(slots)]
+
+
+def fill_compare_slots(current: Dict[str, Optional[float]], previous: Dict[str, Optional[float]],
+                       slots: int = EXAM_SLOTS) -> List[StudentGradeCompareModel]:
+    return [
+        StudentGradeCompareModel(exam=str(i + 1), current_score=current.get(str(i + 1)),
+                                 previous_score=previous.get(str(i + 1)))
+        for i in range(slots)
+    ]
@@ -0,0 +1,122 @@
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.grade_import import create_missing_students
+from common.grade_summary import recompute_keys
+from common.student_resolver import student_resolver
+from common.tool import generate_uuid
+from model.db_model import DbGrade
+from model.grade_model import BatchGradeModel
+
+
+async def apply_grade_batch(session: AsyncSession, batch: BatchGradeModel) -> dict:
+    """
+    在同一事务内批量执行删除、修改、新增，每类操作各用一条批量语句。
+    返回逐条结果以及受影响的班级/学生，不提交事务。
+    """
+    now = datetime.now()
+    deletes = list(dict.fromkeys(batch.deletes))
+    update_items = [(index, item) for index, item in enumerate(batch.upserts) if item.id]
+    create_items = [(index, item) for index, item in enumerate(batch.upserts) if not item.id]
+
+    # 一次查出要删除和修改的成绩原值，用于判断是否存在以及重算汇总
+    existing = {}
+    lookup_ids = deletes + [item.id for _, item in update_items]
+    if lookup_ids:
+        rows = await session.execute(
+            select(DbGrade.id, DbGrade.student_id, DbGrade.class_id, DbGrade.year, DbGrade.semester, DbGrade.exam)
+            .where(DbGrade.id.in_(lookup_ids))
+        )
+        existing = {row.id: row for row in rows}
+
+    touched_keys = set()
+    class_ids = set()
+    student_ids = set()
+
+    def touch(class_id, year, semester, exam, student_id):
+        touched_keys.add((class_id, year, semester, exam))
+        class_ids.add(class_id)
+        student_ids.add(student_id)
+
+    delete_results = []
+    found_deletes = []
+    for grade_id in deletes:
+        row = existing.get(grade_id)
+        if row is None:
+            delete_results.append({"id": grade_id, "status": "not_found"})
+            continue
+        found_deletes.append(grade_id)
+        touch(row.class_id, row.year, row.semester, row.exam, row.student_id)
+        delete_results.append({"id": grade_id, "status": "deleted"})
+    if found_deletes:
+        await session.execute(delete(DbGrade).where(DbGrade.id.in_(found_deletes)))
+
+    upsert_results = [None] * len(batch.upserts)
+
+    updates = []
+    for index, item in update_items:
+        row = existing.get(item.id)
+        if row is None:
+            upsert_results[index] = {"id": item.id, "status": "not_found"}
+            continue
+        touch(row.class_id, row.year, row.semester, row.exam, row.student_id)
+        touch(row.class_id, item.year, item.semester, item.exam, row.student_id)
+        updates.append({"id": item.id, "score": item.score, "year": item.year, "semester": item.semester,
+                        "exam": item.exam, "date": now})
+        upsert_results[index] = {"id": item.id, "status": "updated"}
+    if updates:
+        # ORM 按主键批量更新（executemany）
+        await session.execute(update(DbGrade), updates)
+
+    students_created = 0
+    creates_by_class = defaultdict(list)
+    for index, item in create_items:
+        if not item.name:
+            upsert_results[index] = {"id": None, "status": "error", "detail": "name is required when id is not given"}
+            continue
+        creates_by_class[item.class_id].append((index, item))
+
+    grades = []
+    grade_index = {}
+    for class_id, items in creates_by_class.items():
+        names = [item.name for _, item in items]
+        students = await student_resolver.class_students(session, class_id)
+        existing_count = len(students)
+        await create_missing_students(session, class_id, names, students)
+        students_created += len(students) - existing_count
+        for index, item in items:
+            student_id = students[item.name]
+            touch(class_id, item.year, item.semester, item.exam, student_id)
+            grades.append({"id": generate_uuid(), "student_id": student_id, "class_id": class_id,
+                           "score": item.score, "year": item.year, "semester": item.semester, "exam": item.exam,
+                           "date": now})
+            grade_index.setdefault((student_id, item.year, item.semester, item.exam), []).append(index)
+    if grades:
+        # 同一学生同一场考试已有成绩时按唯一约束更新分数
+        stmt = mysql_insert(DbGrade)
+        stmt = stmt.on_duplicate_key_update(score=stmt.inserted.score, date=stmt.inserted.date)
+        await session.execute(stmt, grades)
+
+        # 已存在的成绩保留原 id，回查一次拿到最终的 id
+        new_ids = {grade["id"] for grade in grades}
+        rows = await session.execute(
+            select(DbGrade.id, DbGrade.student_id, DbGrade.year, DbGrade.semester, DbGrade.exam)
+            .where(tuple_(DbGrade.student_id, DbGrade.year, DbGrade.semester, DbGrade.exam).in_(list(grade_index)))
+        )
+        for row in rows:
+            for index in grade_index.get((row.student_id, row.year, row.semester, row.exam), []):
+                upsert_results[index] = {"id": row.id, "status": "created" if row.id in new_ids else "updated"}
+
+    await recompute_keys(session, touched_keys)
+
+    return {
+        "upserts": upsert_results,
+        "deletes": delete_results,
+        "students_created": students_created,
+        "class_ids": class_ids,
+        "student_ids": student_ids,
+    }
@@ -0,0 +1,165 @@
+"""
+成绩导出：服务端游标按批取数，逐批写出，内存占用只与 EXPORT_BATCH_SIZE 有关，与结果行数无关。
+    csv      边查边写到响应里
+    xlsx     openpyxl write-only 模式写临时文件，写完后按块返回；超过 Excel 单表行数上限时分成多个工作表
+    parquet  pyarrow 按批写 row group 到临时文件，写完后按块返回（需要安装 pyarrow）
+导出的 姓名/成绩 列与导入格式一致，导出的文件可以直接再导入（xlsx 导入只读第一个工作表）。
+"""
+import csv
+import io
+import os
+import tempfile
+from typing import AsyncIterator, Callable
+
+from openpyxl import Workbook
+from sqlalchemy import Select
+from starlette.concurrency import run_in_threadpool
+
+from common.grade_reader import NAME_COLUMN, SCORE_COLUMN
+from db.db import SessionLocal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 未安装 pyarrow 时不支持导出 parquet
+    pa = None
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 2000))
+# 临时文件返回给客户端时每次读取的字节数
+FILE_CHUNK_SIZE = 64 * 1024
+# Excel 单个工作表最多 1048576 行，扣除表头后每个工作表写入的数据行数，超出的写到下一个工作表
+XLSX_SHEET_ROWS = int(os.getenv('XLSX_SHEET_ROWS', 1048575))
+
+# (查询列名, 表头)
+EXPORT_COLUMNS = [
+    ('grade_id', "成绩ID"),
+    ('student_name', NAME_COLUMN),
+    ('class_name', "班级"),
+    ('class_id', "班级ID"),
+    ('year', "年份"),
+    ('semester', "学期"),
+    ('exam', "考试"),
+    ('score', SCORE_COLUMN),
+    ('date', "日期"),
+]
+HEADER = [title for _, title in EXPORT_COLUMNS]
+
+EXPORT_MEDIA_TYPES = {
+    'csv': "text/csv; charset=utf-8",
+    'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    'parquet': "application/vnd.apache.parquet",
+}
+
+
+async def _iter_batches(query: Select) -> AsyncIterator[list]:
+    # 响应是在请求依赖结束后才开始发送的，所以这里单独开 session，导出结束时关闭
+    async with SessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield [tuple(getattr(row, column) for column, _ in EXPORT_COLUMNS) for row in rows]
+
+
+async def _stream_csv(query: Select) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # 带 BOM，Excel 直接打开时中文不乱码
+    writer.writerow(HEADER)
+    yield ('\ufeff' + buffer.getvalue()).encode('utf-8')
+    async for rows in _iter_batches(query):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+
+async def _stream_temp_file(suffix: str, write: Callable[[str], AsyncIterator[None]]) -> AsyncIterator[bytes]:
+    """write 把导出内容写到给定路径，写完后按块读出返回，最后删除临时文件"""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        async for _ in write(path):
+            pass
+        with open(path, 'rb') as f:
+            while True:
+                chunk = await run_in_threadpool(f.read, FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+class _XlsxSheets:
+    """按 XLSX_SHEET_ROWS 分工作表写入，每个工作表都带表头"""
+
+    def __init__(self, workbook: Workbook) -> None:
+        self.workbook = workbook
+        self.sheet = None
+        self.rows = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        index = len(self.workbook.worksheets) + 1
+        self.sheet = self.workbook.create_sheet("成绩" if index == 1 else f"成绩{index}")
+        self.sheet.append(HEADER)
+        self.rows = 0
+
+    def append_rows(self, rows):
+        for row in rows:
+            if self.rows >= XLSX_SHEET_ROWS:
+                self._new_sheet()
+            self.sheet.append(row)
+            self.rows += 1
+
+
+async def _write_xlsx(query: Select, path: str) -> AsyncIterator[None]:
+    # write-only 模式下已写的行落在临时文件里，不在内存中保留整个工作表
+    workbook = Workbook(write_only=True)
+    sheets = _XlsxSheets(workbook)
+    async for rows in _iter_batches(query):
+        # 逐行生成 XML 是 CPU 密集的，每批放到线程池里写，不阻塞事件循环；批次依次写入，同一时刻只有一个线程操作工作表
+        await run_in_threadpool(sheets.append_rows, rows)
+        yield
+    await run_in_threadpool(workbook.save, path)
+
+
+def _parquet_schema():
+    return pa.schema([
+        ('grade_id', pa.string()),
+        ('student_name', pa.string()),
+        ('class_name', pa.string()),
+        ('class_id', pa.string()),
+        ('year', pa.string()),
+        ('semester', pa.string()),
+        ('exam', pa.string()),
+        ('score', pa.float64()),
+        ('date', pa.timestamp('us')),
+    ])
+
+
+async def _write_parquet(query: Select, path: str) -> AsyncIterator[None]:
+    schema = _parquet_schema()
+    writer = pq.ParquetWriter(path, schema)
+    try:
+        async for rows in _iter_batches(query):
+            # 每批一个 row group
+            columns = list(zip(*rows))
+            table = pa.Table.from_arrays([pa.array(values, type=field.type)
+                                          for values, field in zip(columns, schema)], schema=schema)
+            await run_in_threadpool(writer.write_table, table)
+            yield
+    finally:
+        writer.close()
+
+
+def stream_export(query: Select, export_format: str) -> AsyncIterator[bytes]:
+    """返回 StreamingResponse 用的字节流，query 的列需要包含 EXPORT_COLUMNS 中的列名"""
+    if export_format == 'csv':
+        return _stream_csv(query)
+    if export_format == 'xlsx':
+        return _stream_temp_file('.xlsx', lambda path: _write_xlsx(query, path))
+    if export_format == 'parquet':
+        if pa is None:
+            raise ValueError("Parquet export requires pyarrow to be installed")
+        return _stream_temp_file('.parquet', lambda path: _write_parquet(query, path))
+    raise ValueError(f"Unsupported export format: {export_format}")
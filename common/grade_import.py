@@ -0,0 +1,123 @@
+import time
+from datetime import datetime
+from typing import AsyncIterable, Awaitable, Callable, Iterable, List, Tuple, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.student_resolver import student_resolver
+from common.tool import generate_uuid, handle_nan
+from model.db_model import DbStudent, DbGrade
+
+# IN 查询每批的名字数量，避免语句过长
+LOOKUP_BATCH = 1000
+
+
+async def resolve_students(session: AsyncSession, class_id: str, names: Iterable[str]) -> dict:
+    """按 (姓名, 班级) 批量查出已有学生，返回 {name: student_id}"""
+    names = list(dict.fromkeys(names))
+    found = {}
+    for i in range(0, len(names), LOOKUP_BATCH):
+        batch = names[i:i + LOOKUP_BATCH]
+        rows = await session.execute(
+            select(DbStudent.id, DbStudent.name)
+            .where(DbStudent.class_id == class_id, DbStudent.name.in_(batch))
+            .order_by(DbStudent.created_time)
+        )
+        for student_id, name in rows:
+            # 同班重名时取最早创建的学生
+            found.setdefault(name, student_id)
+    return found
+
+
+async def create_missing_students(session: AsyncSession, class_id: str, names: Iterable[str],
+                                  existing: dict) -> dict:
+    """把 existing 中没有的名字批量插入为新学生，并写回 existing"""
+    now = datetime.now()
+    new_students = []
+    for name in dict.fromkeys(names):
+        if name not in existing:
+            student_id = generate_uuid()
+            existing[name] = student_id
+            new_students.append({"id": student_id, "name": name, "class_id": class_id, "created_time": now})
+    if new_students:
+        await session.execute(insert(DbStudent), new_students)
+    return existing
+
+
+async def import_grade_rows(session: AsyncSession, rows: Iterable[Tuple[str, Optional[float]]], class_id: str,
+                            year: str, semester: str, exam: str, students: Optional[dict] = None) -> dict:
+    """
+    批量导入一批 (姓名, 成绩)：一次查询解析学生，批量创建缺失学生，executemany 插入成绩。
+    传入 students（班级的 {姓名: 学生 id}）时不再查库，新建的学生会写回其中。
+    成绩按唯一约束 uq_grade_student_exam upsert，重复导入同一场考试只会更新分数。
+    不提交事务，由调用方决定何时 commit。
+    """
+    start = time.perf_counter()
+    rows = [(str(name), handle_nan(score)) for name, score in rows]
+    names = [name for name, _ in rows]
+
+    if students is None:
+        students = await resolve_students(session, class_id, names)
+    existing_count = len(students)
+    await create_missing_students(session, class_id, names, students)
+
+    now = datetime.now()
+    grades = [
+        {
+            "id": generate_uuid(),
+            "student_id": students[name],
+            "class_id": class_id,
+            "score": score,
+            "year": year,
+            "semester": semester,
+            "exam": exam,
+            "date": now,
+        }
+        for name, score in rows
+    ]
+    if grades:
+        stmt = mysql_insert(DbGrade)
+        stmt = stmt.on_duplicate_key_update(score=stmt.inserted.score, date=stmt.inserted.date)
+        await session.execute(stmt, grades)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": len(grades),
+        "students_created": len(students) - existing_count,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_sec": round(len(grades) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+async def import_grade_chunks(session: AsyncSession, chunks: AsyncIterable[List[Tuple[str, Optional[float]]]],
+                              class_id: str, year: str, semester: str, exam: str,
+                              on_progress: Optional[Callable[[dict], Awaitable[None]]] = None) -> dict:
+    """
+    逐批写库，学生从按班级缓存的姓名索引解析，后面批次能用上前面批次新建的学生；
+    每批写完回调 on_progress 汇报进度
+    """
+    start = time.perf_counter()
+    total_rows = 0
+    students_created = 0
+    students = await student_resolver.class_students(session, class_id)
+    async for chunk in chunks:
+        stats = await import_grade_rows(session, chunk, class_id, year, semester, exam, students)
+        total_rows += stats["rows"]
+        students_created += stats["students_created"]
+        if on_progress:
+            elapsed = time.perf_counter() - start
+            await on_progress({
+                "rows": total_rows,
+                "students_created": students_created,
+                "rows_per_sec": round(total_rows / elapsed, 1) if elapsed > 0 else None,
+            })
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": total_rows,
+        "students_created": students_created,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_sec": round(total_rows / elapsed, 1) if elapsed > 0 else None,
+    }
@@ -0,0 +1,79 @@
+import csv
+import math
+import os
+from typing import Iterator, List, Optional, Tuple
+
+from openpyxl import load_workbook
+
+NAME_COLUMN = "姓名"
+SCORE_COLUMN = "成绩"
+# 每批写库的行数，内存占用只与该值有关，与文件大小无关
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 2000))
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+CSV_EXTENSIONS = ('.csv',)
+
+
+class GradeFileFormatError(ValueError):
+    pass
+
+
+def _to_score(value) -> Optional[float]:
+    if value is None or value == '':
+        return None
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(score) else score
+
+
+def _iter_excel_rows(file_name: str) -> Iterator[tuple]:
+    # 只读模式按行流式读取，不把整个工作簿载入内存
+    workbook = load_workbook(file_name, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv_rows(file_name: str) -> Iterator[list]:
+    with open(file_name, 'r', encoding='utf-8-sig', newline='') as f:
+        yield from csv.reader(f)
+
+
+def iter_rows(file_name: str) -> Iterator[tuple]:
+    ext = os.path.splitext(file_name)[1].lower()
+    if ext in CSV_EXTENSIONS:
+        return _iter_csv_rows(file_name)
+    if ext in EXCEL_EXTENSIONS:
+        return _iter_excel_rows(file_name)
+    raise GradeFileFormatError(f"Unsupported file type: {ext}")
+
+
+def iter_grade_chunks(file_name: str,
+                      chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator[List[Tuple[str, Optional[float]]]]:
+    """按表头定位 姓名/成绩 列，逐行读取并按 chunk_size 分批产出 (姓名, 成绩)"""
+    rows = iter_rows(file_name)
+    header = next(rows, None)
+    if header is None:
+        raise GradeFileFormatError("File is empty")
+
+    header = [str(cell).strip() if cell is not None else '' for cell in header]
+    if NAME_COLUMN not in header or SCORE_COLUMN not in header:
+        raise GradeFileFormatError(
+            f"File format incorrect. Required columns: '{NAME_COLUMN}', '{SCORE_COLUMN}'")
+    name_idx = header.index(NAME_COLUMN)
+    score_idx = header.index(SCORE_COLUMN)
+
+    chunk = []
+    for row in rows:
+        if len(row) <= name_idx or row[name_idx] is None or str(row[name_idx]).strip() == '':
+            continue
+        score = row[score_idx] if len(row) > score_idx else None
+        chunk.append((str(row[name_idx]).strip(), _to_score(score)))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,91 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from model.db_model import DbGrade
+
+PASS_SCORE = float(os.getenv('PASS_SCORE', 60))
+FULL_SCORE = float(os.getenv('FULL_SCORE', 100))
+BAND_COUNT = 10
+# 分数段边界：0-10, 10-20, ..., 90-100（最后一段包含满分，超出满分的计入最后一段）
+BAND_EDGES = np.linspace(0, FULL_SCORE, BAND_COUNT + 1)
+BAND_LABELS = [f"{BAND_EDGES[i]:g}-{BAND_EDGES[i + 1]:g}" for i in range(BAND_COUNT)]
+
+GROUP_COLUMNS = ('class_id', 'year', 'semester', 'exam')
+
+
+def band_index(score: float) -> int:
+    """分数所在分数段的下标，与 np.histogram 的分段规则一致"""
+    index = int(score * BAND_COUNT // FULL_SCORE)
+    return min(max(index, 0), BAND_COUNT - 1)
+
+
+def score_band():
+    """SQL 中成绩所在分数段的下标，与 band_index 一致"""
+    return func.least(func.greatest(func.floor(DbGrade.score * BAND_COUNT / FULL_SCORE), 0), BAND_COUNT - 1)
+
+
+def _filter(query, class_id: Optional[str], year: Optional[str], semester: Optional[str], exam: Optional[str]):
+    query = query.where(DbGrade.score.isnot(None))
+    if class_id:
+        query = query.where(DbGrade.class_id == class_id)
+    if year:
+        query = query.where(DbGrade.year == year)
+    if semester:
+        query = query.where(DbGrade.semester == semester)
+    if exam:
+        query = query.where(DbGrade.exam == exam)
+    return query
+
+
+async def compute_stats(session: AsyncSession, class_id: Optional[str] = None, year: Optional[str] = None,
+                        semester: Optional[str] = None, exam: Optional[str] = None) -> List[dict]:
+    """
+    按 (班级, 学年, 学期, 考试) 分组精确统计：计数、均值、极值、及格率和分数段由 SQL 聚合完成，
+    只有中位数需要取出分数，按分组键和分数排序读成一个数组，再按各组的条数切分。
+    """
+    group_columns = (DbGrade.class_id, DbGrade.year, DbGrade.semester, DbGrade.exam)
+    band = score_band()
+    aggregate_query = _filter(
+        select(
+            *group_columns,
+            func.count(DbGrade.score),
+            func.avg(DbGrade.score),
+            func.stddev_pop(DbGrade.score),
+            func.min(DbGrade.score),
+            func.max(DbGrade.score),
+            func.sum(case((DbGrade.score >= PASS_SCORE, 1), else_=0)),
+            *[func.sum(case((band == i, 1), else_=0)) for i in range(BAND_COUNT)],
+        ),
+        class_id, year, semester, exam
+    ).group_by(*group_columns).order_by(*group_columns)
+    groups = (await session.execute(aggregate_query)).all()
+    if not groups:
+        return []
+
+    score_query = _filter(select(DbGrade.score), class_id, year, semester, exam) \
+        .order_by(*group_columns, DbGrade.score)
+    scores = np.array((await session.execute(score_query)).scalars().all(), dtype=float)
+
+    stats = []
+    begin = 0
+    for row in groups:
+        count, mean, stddev, min_score, max_score, passed = row[4:10]
+        end = begin + count
+        item = dict(zip(GROUP_COLUMNS, row[:4]))
+        item.update({
+            "count": count,
+            "mean": round(float(mean), 2),
+            "median": round(float(np.median(scores[begin:end])), 2),
+            "stddev": round(float(stddev), 2),
+            "min": float(min_score),
+            "max": float(max_score),
+            "pass_rate": round(int(passed) / count, 4),
+            "histogram": [{"band": label, "count": int(n)} for label, n in zip(BAND_LABELS, row[10:])],
+        })
+        stats.append(item)
+        begin = end
+    return stats
@@ -0,0 +1,192 @@
+"""
+grade_summary 汇总表的增量维护与读取。
+
+成绩的新增/修改/删除在同一事务内更新对应 (班级, 学年, 学期, 考试) 的汇总行，
+统计接口直接读汇总行，不再扫描 grade 表。汇总数据出现偏差时可整体重建:
+    python -m common.grade_summary --rebuild
+"""
+import argparse
+import asyncio
+import math
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, false, func, insert, or_, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from common.grade_stats import BAND_COUNT, BAND_EDGES, BAND_LABELS, GROUP_COLUMNS, PASS_SCORE, band_index, \
+    score_band
+from db.db import engine, dispose_engine
+from model.db_model import DbGrade, DbGradeSummary
+
+BUCKET_COLUMNS = [f"bucket_{i}" for i in range(BAND_COUNT)]
+
+
+def _key_filter(key: Tuple[str, str, str, str]):
+    class_id, year, semester, exam = key
+    return and_(DbGradeSummary.class_id == class_id, DbGradeSummary.year == year,
+                DbGradeSummary.semester == semester, DbGradeSummary.exam == exam)
+
+
+async def add_score(session, key: Tuple[str, str, str, str], score: Optional[float]):
+    """新增一条成绩，累加到汇总行"""
+    if score is None:
+        return
+    bucket = BUCKET_COLUMNS[band_index(score)]
+    passed = 1 if score >= PASS_SCORE else 0
+    now = datetime.now()
+    summary = DbGradeSummary.__table__.c
+
+    values = dict(zip(GROUP_COLUMNS, key))
+    values.update({
+        "score_count": 1, "score_sum": score, "score_sq_sum": score * score, "pass_count": passed,
+        "min_score": score, "max_score": score, bucket: 1, "stale": False, "updated_time": now,
+    })
+    stmt = mysql_insert(DbGradeSummary).values(**values)
+    stmt = stmt.on_duplicate_key_update({
+        "score_count": summary.score_count + 1,
+        "score_sum": summary.score_sum + score,
+        "score_sq_sum": summary.score_sq_sum + score * score,
+        "pass_count": summary.pass_count + passed,
+        "min_score": func.least(func.coalesce(summary.min_score, score), score),
+        "max_score": func.greatest(func.coalesce(summary.max_score, score), score),
+        bucket: summary[bucket] + 1,
+        "updated_time": now,
+    })
+    await session.execute(stmt)
+
+
+async def remove_score(session, key: Tuple[str, str, str, str], score: Optional[float]):
+    """删除一条成绩，从汇总行中减去；删掉的是最高/最低分时标记为 stale"""
+    if score is None:
+        return
+    bucket = BUCKET_COLUMNS[band_index(score)]
+    summary = DbGradeSummary.__table__.c
+    await session.execute(
+        update(DbGradeSummary)
+        .where(_key_filter(key))
+        .values({
+            "score_count": summary.score_count - 1,
+            "score_sum": summary.score_sum - score,
+            "score_sq_sum": summary.score_sq_sum - score * score,
+            "pass_count": summary.pass_count - (1 if score >= PASS_SCORE else 0),
+            bucket: summary[bucket] - 1,
+            "stale": or_(summary.stale, summary.min_score >= score, summary.max_score <= score),
+            "updated_time": datetime.now(),
+        })
+    )
+
+
+def _aggregate_query():
+    """直接从 grade 表统计出汇总行的所有列"""
+    band = score_band()
+    return (
+        select(
+            DbGrade.class_id, DbGrade.year, DbGrade.semester, DbGrade.exam,
+            func.count(DbGrade.score),
+            func.sum(DbGrade.score),
+            func.sum(DbGrade.score * DbGrade.score),
+            func.sum(case((DbGrade.score >= PASS_SCORE, 1), else_=0)),
+            func.min(DbGrade.score),
+            func.max(DbGrade.score),
+            *[func.sum(case((band == i, 1), else_=0)) for i in range(BAND_COUNT)],
+            false(),
+            func.now(),
+        )
+        .where(DbGrade.score.isnot(None), DbGrade.class_id.isnot(None), DbGrade.year.isnot(None),
+               DbGrade.semester.isnot(None), DbGrade.exam.isnot(None))
+        .group_by(DbGrade.class_id, DbGrade.year, DbGrade.semester, DbGrade.exam)
+    )
+
+
+SUMMARY_COLUMNS = list(GROUP_COLUMNS) + ["score_count", "score_sum", "score_sq_sum", "pass_count", "min_score",
+                                         "max_score"] + BUCKET_COLUMNS + ["stale", "updated_time"]
+
+
+async def recompute_keys(session, keys: Iterable[Tuple[str, str, str, str]]):
+    """按 grade 表重新统计指定的汇总行（批量导入、删除学生等无法增量计算的场景）"""
+    for key in set(keys):
+        class_id, year, semester, exam = key
+        await session.execute(delete(DbGradeSummary).where(_key_filter(key)))
+        query = _aggregate_query().where(DbGrade.class_id == class_id, DbGrade.year == year,
+                                         DbGrade.semester == semester, DbGrade.exam == exam)
+        await session.execute(insert(DbGradeSummary).from_select(SUMMARY_COLUMNS, query))
+
+
+async def rebuild_all(conn):
+    """清空并整体重建汇总表"""
+    await conn.execute(delete(DbGradeSummary))
+    await conn.execute(insert(DbGradeSummary).from_select(SUMMARY_COLUMNS, _aggregate_query()))
+
+
+def _estimate_median(row, buckets: List[int]) -> Optional[float]:
+    # 在直方图上线性插值估算中位数
+    half = row.score_count / 2
+    seen = 0
+    for i, count in enumerate(buckets):
+        if count and seen + count >= half:
+            low, high = float(BAND_EDGES[i]), float(BAND_EDGES[i + 1])
+            low, high = max(low, row.min_score), min(high, row.max_score)
+            return round(low + (half - seen) / count * (high - low), 2)
+        seen += count
+    return None
+
+
+def to_stats(row: DbGradeSummary) -> dict:
+    buckets = [getattr(row, column) for column in BUCKET_COLUMNS]
+    n = row.score_count
+    mean = row.score_sum / n
+    variance = max(row.score_sq_sum / n - mean * mean, 0.0)
+    item = {column: getattr(row, column) for column in GROUP_COLUMNS}
+    item.update({
+        "count": n,
+        "mean": round(mean, 2),
+        "median": _estimate_median(row, buckets),
+        "stddev": round(math.sqrt(variance), 2),
+        "min": row.min_score,
+        "max": row.max_score,
+        "pass_rate": round(row.pass_count / n, 4),
+        "histogram": [{"band": label, "count": count} for label, count in zip(BAND_LABELS, buckets)],
+    })
+    return item
+
+
+async def read_stats(session, class_id: Optional[str] = None, year: Optional[str] = None,
+                     semester: Optional[str] = None, exam: Optional[str] = None) -> List[dict]:
+    query = select(DbGradeSummary).order_by(DbGradeSummary.class_id, DbGradeSummary.year,
+                                            DbGradeSummary.semester, DbGradeSummary.exam)
+    if class_id:
+        query = query.where(DbGradeSummary.class_id == class_id)
+    if year:
+        query = query.where(DbGradeSummary.year == year)
+    if semester:
+        query = query.where(DbGradeSummary.semester == semester)
+    if exam:
+        query = query.where(DbGradeSummary.exam == exam)
+
+    rows = (await session.execute(query)).scalars().all()
+    stale = [tuple(getattr(row, c) for c in GROUP_COLUMNS) for row in rows if row.stale]
+    if stale:
+        await recompute_keys(session, stale)
+        await session.commit()
+        rows = (await session.execute(query.execution_options(populate_existing=True))).scalars().all()
+    return [to_stats(row) for row in rows if row.score_count > 0]
+
+
+async def _rebuild():
+    try:
+        async with engine.begin() as conn:
+            await rebuild_all(conn)
+        print("grade_summary rebuilt")
+    finally:
+        await dispose_engine()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Maintain the grade_summary table")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every summary row from the grade table")
+    args = parser.parse_args()
+    if args.rebuild:
+        asyncio.run(_rebuild())
+    else:
+        parser.print_help()
@@ -0,0 +1,31 @@
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+from common.cache import etag_for
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # 弱比较：忽略 W/ 前缀
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in tags]
+
+
+async def check_not_modified(request: Request, response: Response, key: str,
+                             tags: Iterable[str]) -> Optional[Response]:
+    """
+    设置 ETag 响应头；请求带的 If-None-Match 与当前版本一致时返回 304 响应，
+    调用方直接返回它，不再查库和序列化。
+    """
+    etag = await etag_for(key, tags)
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
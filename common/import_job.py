@@ -0,0 +1,208 @@
+import asyncio
+import contextvars
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool
+
+from common.cache import invalidate
+from common.grade_import import import_grade_chunks
+from common.grade_reader import iter_grade_chunks
+from common.grade_summary import recompute_keys
+from common.metrics import metrics
+from common.name_index import student_name_index
+from common.student_resolver import student_resolver
+from common.tool import generate_uuid
+from db.db import SessionLocal
+from model.db_model import DbImportJob
+from model.grade_model import ImportGradeModel, ImportJobModel
+
+# 同时执行的导入任务数，文件解析在线程池中进行
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', 2))
+# pending/running 的任务超过这么久没有更新，视为所在进程已退出，允许重新提交
+STALE_JOB_SECONDS = int(os.getenv('IMPORT_STALE_JOB_SECONDS', 1800))
+# 进度最多每隔这么多秒写一次库
+PROGRESS_INTERVAL = 1.0
+# 排队和执行期间定期刷新 updated_time，证明所在进程还活着；间隔远小于 STALE_JOB_SECONDS
+HEARTBEAT_INTERVAL = max(min(60, STALE_JOB_SECONDS // 3), 1)
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def _to_model(row: DbImportJob) -> ImportJobModel:
+    return ImportJobModel(
+        id=row.id,
+        file_id=row.file_id,
+        class_id=row.class_id,
+        year=row.year,
+        semester=row.semester,
+        exam=row.exam,
+        status=row.status,
+        rows_processed=row.rows_processed,
+        students_created=row.students_created,
+        rows_per_sec=row.rows_per_sec,
+        errors=json.loads(row.errors) if row.errors else [],
+        created_time=row.created_time,
+        started_time=row.started_time,
+        finished_time=row.finished_time,
+    )
+
+
+def _is_stale(row: DbImportJob) -> bool:
+    return row.status in (PENDING, RUNNING) and \
+        row.updated_time < datetime.now() - timedelta(seconds=STALE_JOB_SECONDS)
+
+
+async def _update_job(job_id: str, **values):
+    # 导入本身在一个长事务里，进度用单独的短事务写入，其他 worker 才能看到
+    values["updated_time"] = datetime.now()
+    async with SessionLocal() as session:
+        await session.execute(update(DbImportJob).where(DbImportJob.id == job_id).values(**values))
+        await session.commit()
+
+
+class ImportJobManager:
+    """
+    成绩导入后台任务：提交后立即返回任务 id。任务记录在 import_job 表中，任何 worker 都能查询进度。
+    同一文件以相同的 班级/学年/学期/考试 参数只会导入一次（失败或所在进程退出后允许重试）；
+    参数不同则是另一个任务。
+    """
+
+    def __init__(self, workers: int = IMPORT_WORKERS) -> None:
+        self.workers = workers
+        # 本进程正在排队或执行的任务，按任务 id
+        self._tasks = {}
+        self._semaphore = None
+
+    async def get(self, session: AsyncSession, job_id: str) -> Optional[ImportJobModel]:
+        row = await session.get(DbImportJob, job_id)
+        return _to_model(row) if row else None
+
+    async def _find(self, session: AsyncSession, gradeImp: ImportGradeModel) -> Optional[DbImportJob]:
+        return (await session.execute(
+            select(DbImportJob)
+            .where(DbImportJob.file_id == gradeImp.file_id, DbImportJob.class_id == gradeImp.class_id,
+                   DbImportJob.year == gradeImp.year, DbImportJob.semester == gradeImp.semester,
+                   DbImportJob.exam == gradeImp.exam)
+            .execution_options(populate_existing=True)
+        )).scalars().first()
+
+    async def submit(self, session: AsyncSession, gradeImp: ImportGradeModel, file_name: str) -> ImportJobModel:
+        now = datetime.now()
+        row = await self._find(session, gradeImp)
+        # 本进程里还有这个任务在跑时，不论库里的状态如何都不再重复启动
+        if row is not None and (row.id in self._tasks or row.status != FAILED and not _is_stale(row)):
+            return _to_model(row)
+
+        if row is None:
+            row = DbImportJob(
+                id=generate_uuid(),
+                file_id=gradeImp.file_id,
+                class_id=gradeImp.class_id,
+                year=gradeImp.year,
+                semester=gradeImp.semester,
+                exam=gradeImp.exam,
+                created_time=now,
+            )
+            session.add(row)
+        # 失败或中断的任务沿用原 id 重新执行
+        row.status = PENDING
+        row.rows_processed = 0
+        row.students_created = 0
+        row.rows_per_sec = None
+        row.errors = None
+        row.started_time = None
+        row.finished_time = None
+        row.updated_time = now
+        try:
+            await session.commit()
+        except IntegrityError:
+            # 其他 worker 同时提交了同样的任务，以它的为准
+            await session.rollback()
+            return _to_model(await self._find(session, gradeImp))
+
+        job = _to_model(row)
+        # 在空的上下文中运行，导入的 SQL 不计入提交它的请求的剖析和指标
+        task = asyncio.create_task(self._run(job, file_name), context=contextvars.Context())
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    async def shutdown(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _heartbeat(job_id: str):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await _update_job(job_id)
+            except Exception:  # 偶发的数据库错误不终止心跳，下一轮再写
+                pass
+
+    async def _run(self, job: ImportJobModel, file_name: str):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+
+        last_write = 0.0
+
+        async def on_progress(progress: dict):
+            nonlocal last_write
+            if time.monotonic() - last_write < PROGRESS_INTERVAL:
+                return
+            last_write = time.monotonic()
+            await _update_job(job.id, rows_processed=progress["rows"], students_created=progress["students_created"],
+                              rows_per_sec=progress["rows_per_sec"])
+
+        # 排队等待 worker 时也刷新 updated_time，否则长时间排队的任务会被当成进程已退出而重复提交
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            async with self._semaphore:
+                await _update_job(job.id, status=RUNNING, started_time=datetime.now())
+                async with SessionLocal() as session:
+                    try:
+                        chunks = iterate_in_threadpool(iter_grade_chunks(file_name))
+                        stats = await import_grade_chunks(session, chunks, job.class_id, job.year, job.semester,
+                                                          job.exam, on_progress=on_progress)
+                        await recompute_keys(session, [(job.class_id, job.year, job.semester, job.exam)])
+                        # 整个文件在一个事务内提交，失败时全部回滚，重试不会重复写入
+                        await session.commit()
+                    except Exception:
+                        await session.rollback()
+                        raise
+                await invalidate(class_ids=[job.class_id], all_students=True)
+                if stats["students_created"]:
+                    student_name_index.invalidate()
+                    student_resolver.invalidate(job.class_id)
+                await _update_job(job.id, status=SUCCEEDED, rows_processed=stats["rows"],
+                                  students_created=stats["students_created"], rows_per_sec=stats["rows_per_sec"],
+                                  finished_time=datetime.now())
+                metrics.import_finished(SUCCEEDED, stats["rows"], stats["elapsed_s"])
+        except asyncio.CancelledError:
+            # 进程关闭时中断的任务标记为失败，重启后可以重新提交
+            await _update_job(job.id, status=FAILED, errors=json.dumps(["Interrupted by shutdown"]),
+                              finished_time=datetime.now())
+            metrics.import_finished(FAILED)
+            raise
+        except Exception as e:
+            await _update_job(job.id, status=FAILED, errors=json.dumps([str(e)], ensure_ascii=False),
+                              finished_time=datetime.now())
+            metrics.import_finished(FAILED)
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+
+import_jobs = ImportJobManager()
@@ -0,0 +1,55 @@
+"""
+列表接口的快速序列化：查询结果直接映射成 dict，用 orjson 编码后返回，
+跳过 FastAPI 对 APIResponse 的 response_model 校验和 jsonable_encoder，输出的 JSON 结构不变。
+未安装 orjson 时退回标准库 json。
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用标准库 json
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode='json')
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def api_response(data: Any, response: Optional[Response] = None, message: str = "Success", code: int = 200,
+                 status: bool = True) -> FastJSONResponse:
+    """
+    与 APIResponse 字段一致的响应。直接返回 Response 时 FastAPI 不会合并依赖注入的 response 上的头，
+    传入 response 时把它的头（ETag 等）带上。
+    """
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != 'content-length'}
+    return FastJSONResponse(
+        content={"code": code, "status": status, "message": message, "data": data},
+        headers=headers,
+    )
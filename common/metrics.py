@@ -0,0 +1,231 @@
+"""
+Prometheus 文本格式的进程内指标，/metrics 输出。多 worker 部署时每个进程各自统计。
+
+    http_requests_total{method,route,status}         请求数
+    http_request_duration_seconds{method,route}      请求耗时直方图
+    http_requests_in_flight{route}                   正在处理的请求数
+    db_queries_per_request{route}                    每个请求的 SQL 条数直方图
+    db_time_per_request_seconds{route}               每个请求的 SQL 总耗时直方图
+    db_queries_total / db_query_seconds_total        SQL 总条数与总耗时
+    db_pool_*                                        连接池使用情况
+    import_*                                         成绩导入行数、耗时与速度
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+from db.db import engine, pool_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+# 不匹配任何路由的请求统一记到这个标签下，避免 404 扫描把标签数撑爆
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+
+    def __init__(self, buckets) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+class RequestDbStats:
+    """当前请求执行的 SQL 条数和耗时，由 engine 事件累加"""
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.time = 0.0
+
+
+request_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar('request_db_stats', default=None)
+
+
+def _labels(**labels) -> str:
+    # Prometheus 标签值中的反斜杠、引号、换行需要转义
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class Metrics:
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.latency = {}
+        self.in_flight = {}
+        self.db_queries = {}
+        self.db_time = {}
+        self.db_queries_total = 0
+        self.db_query_seconds_total = 0.0
+        self.import_rows_total = 0
+        self.import_seconds_total = 0.0
+        self.import_jobs = {}
+        self.import_last_rows_per_sec = 0.0
+
+    def request_started(self, route: str):
+        with self._lock:
+            self.in_flight[route] = self.in_flight.get(route, 0) + 1
+
+    def request_finished(self, method: str, route: str, status: int, elapsed: float,
+                         db_stats: Optional[RequestDbStats]):
+        with self._lock:
+            self.in_flight[route] -= 1
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault((method, route), Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            if db_stats is not None:
+                self.db_queries.setdefault(route, Histogram(QUERY_COUNT_BUCKETS)).observe(db_stats.queries)
+                self.db_time.setdefault(route, Histogram(LATENCY_BUCKETS)).observe(db_stats.time)
+
+    def query_executed(self, elapsed: float):
+        with self._lock:
+            self.db_queries_total += 1
+            self.db_query_seconds_total += elapsed
+
+    def import_finished(self, status: str, rows: int = 0, elapsed: float = 0.0):
+        with self._lock:
+            self.import_jobs[status] = self.import_jobs.get(status, 0) + 1
+            self.import_rows_total += rows
+            self.import_seconds_total += elapsed
+            if elapsed > 0:
+                self.import_last_rows_per_sec = rows / elapsed
+
+    @staticmethod
+    def _histogram(lines: list, name: str, histograms: dict, label_names: tuple):
+        for key, histogram in sorted(histograms.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            labels = dict(zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+    def render(self) -> str:
+        pool = pool_stats.snapshot()
+        lines = []
+        with self._lock:
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            self._histogram(lines, "http_request_duration_seconds", self.latency, ('method', 'route'))
+            lines.append("# TYPE http_requests_in_flight gauge")
+            for route, count in sorted(self.in_flight.items()):
+                lines.append(f"http_requests_in_flight{_labels(route=route)} {count}")
+
+            lines.append("# TYPE db_queries_per_request histogram")
+            self._histogram(lines, "db_queries_per_request", self.db_queries, ('route',))
+            lines.append("# TYPE db_time_per_request_seconds histogram")
+            self._histogram(lines, "db_time_per_request_seconds", self.db_time, ('route',))
+            lines.append("# TYPE db_queries_total counter")
+            lines.append(f"db_queries_total {self.db_queries_total}")
+            lines.append("# TYPE db_query_seconds_total counter")
+            lines.append(f"db_query_seconds_total {self.db_query_seconds_total}")
+
+            lines.append("# TYPE import_jobs_total counter")
+            for status, count in sorted(self.import_jobs.items()):
+                lines.append(f"import_jobs_total{_labels(status=status)} {count}")
+            lines.append("# TYPE import_rows_total counter")
+            lines.append(f"import_rows_total {self.import_rows_total}")
+            lines.append("# TYPE import_seconds_total counter")
+            lines.append(f"import_seconds_total {self.import_seconds_total}")
+            lines.append("# TYPE import_last_rows_per_second gauge")
+            lines.append(f"import_last_rows_per_second {self.import_last_rows_per_sec}")
+
+        for name in ("checked_out", "checked_in", "overflow", "pool_size", "max_overflow"):
+            lines.append(f"# TYPE db_pool_{name} gauge")
+            lines.append(f"db_pool_{name} {pool[name]}")
+        for name in ("connects", "checkouts", "timeouts"):
+            lines.append(f"# TYPE db_pool_{name}_total counter")
+            lines.append(f"db_pool_{name}_total {pool[name]}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    metrics.query_executed(elapsed)
+    # SQLAlchemy 在 greenlet 中执行时沿用调用方的 contextvars，这里能拿到当前请求的统计
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.time += elapsed
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _handle_error(exception_context):
+    # 语句出错时不会触发 after_cursor_execute，把开始时间出栈
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_start'):
+        conn.info['query_start'].pop()
+
+
+def route_path(scope) -> str:
+    """取匹配到的路由模板（如 /grade/{grade_id}），避免按实际路径打标签"""
+    app = scope.get("app")
+    if app is None:
+        return UNMATCHED_ROUTE
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件，流式响应（导出）也按整个响应发送完成计时"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = route_path(scope)
+        status = 500
+        db_stats = RequestDbStats()
+        token = request_db_stats.set(db_stats)
+        metrics.request_started(route)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.request_finished(scope["method"], route, status, time.perf_counter() - start, db_stats)
+            request_db_stats.reset(token)
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from model.db_model import DbStudent
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 未安装 pypinyin 时不支持拼音首字母搜索
+    lazy_pinyin = None
+
+# 定期整体重建，弥补多进程部署时其他 worker 的写入
+NAME_INDEX_TTL = int(os.getenv('NAME_INDEX_TTL', 300))
+# 匹配的学生超过这个数（如常见的单字查询）时不再拼 IN 列表，改为关联 student 表过滤
+NAME_FILTER_MAX_IDS = int(os.getenv('NAME_FILTER_MAX_IDS', 1000))
+
+
+def name_initials(name: str) -> str:
+    if lazy_pinyin is None:
+        return ''
+    return ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER)).lower()
+
+
+class StudentNameIndex:
+    """
+    学生姓名的内存倒排索引：按单字建索引，查询时取各字 id 集合的交集再校验子串，
+    替代 LIKE '%name%' 的全表扫描。纯字母查询时按拼音首字母匹配（如 wrc -> 王若宸）。
+    """
+
+    def __init__(self, ttl: int = NAME_INDEX_TTL) -> None:
+        self.ttl = ttl
+        self._students = {}
+        self._chars = defaultdict(set)
+        self._initial_chars = defaultdict(set)
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    async def ensure_loaded(self, session: AsyncSession):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        async with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            rows = (await session.execute(select(DbStudent.id, DbStudent.name, DbStudent.class_id))).all()
+            self._students = {}
+            self._chars = defaultdict(set)
+            self._initial_chars = defaultdict(set)
+            for student_id, name, class_id in rows:
+                self.add(student_id, name, class_id)
+            self._loaded_at = time.monotonic()
+
+    def add(self, student_id: str, name: str, class_id: Optional[str]):
+        self.remove(student_id)
+        name = name or ''
+        initials = name_initials(name)
+        self._students[student_id] = (name, class_id, initials)
+        for char in set(name.lower()):
+            self._chars[char].add(student_id)
+        for char in set(initials):
+            self._initial_chars[char].add(student_id)
+
+    def remove(self, student_id: str):
+        student = self._students.pop(student_id, None)
+        if not student:
+            return
+        for index, text in ((self._chars, student[0].lower()), (self._initial_chars, student[2])):
+            for char in set(text):
+                ids = index.get(char)
+                if ids is not None:
+                    ids.discard(student_id)
+                    if not ids:
+                        del index[char]
+
+    @staticmethod
+    def _candidates(index: dict, query: str) -> set:
+        candidates = None
+        for ids in sorted((index.get(char, set()) for char in set(query)), key=len):
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        return candidates or set()
+
+    @staticmethod
+    def _is_initials_query(query: str) -> bool:
+        return lazy_pinyin is not None and query.isascii() and query.isalpha()
+
+    def _match(self, query: str) -> List[str]:
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        matched = [student_id for student_id in self._candidates(self._chars, query)
+                   if query in self._students[student_id][0].lower()]
+        if self._is_initials_query(query):
+            matched_set = set(matched)
+            matched += [student_id for student_id in self._candidates(self._initial_chars, query)
+                        if student_id not in matched_set and query in self._students[student_id][2]]
+        return matched
+
+    async def search(self, session: AsyncSession, query: str, class_id: Optional[str] = None) -> List[str]:
+        await self.ensure_loaded(session)
+        ids = self._match(query.strip())
+        if class_id:
+            ids = [student_id for student_id in ids if self._students[student_id][1] == class_id]
+        return ids
+
+    async def filter_condition(self, session: AsyncSession, query: Optional[str], student_id_column,
+                               class_id: Optional[str] = None):
+        """
+        按姓名过滤 student_id_column 的条件，查询去掉空白后为空时返回 None（不过滤）。
+        匹配的学生不多时用 id IN (...)；超过 NAME_FILTER_MAX_IDS 时改为 student 表子查询，
+        按 student_id 列上的索引完成关联，避免上千个参数的 IN 列表。
+        """
+        query = (query or '').strip()
+        if not query:
+            return None
+        ids = await self.search(session, query, class_id)
+        if len(ids) <= NAME_FILTER_MAX_IDS:
+            return student_id_column.in_(ids)
+        if self._is_initials_query(query):
+            # 拼音首字母只在内存索引里有，数据库无法等价过滤
+            raise ValueError("Name query matches too many students, please be more specific")
+        subquery = select(DbStudent.id).where(DbStudent.name.contains(query, autoescape=True))
+        if class_id:
+            subquery = subquery.where(DbStudent.class_id == class_id)
+        return student_id_column.in_(subquery)
+
+
+student_name_index = StudentNameIndex()
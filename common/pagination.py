@@ -0,0 +1,69 @@
+import base64
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Hashable, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+# 总数缓存的有效期（秒），游标翻页时不必每页都 count 全表
+COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 30))
+COUNT_CACHE_SIZE = 1024
+
+
+def encode_cursor(sort_value: Optional[datetime], row_id: str) -> str:
+    payload = [sort_value.isoformat() if sort_value else None, row_id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], str]:
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(sort_value) if sort_value else None), str(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_after(sort_column, id_column, sort_value: Optional[datetime], row_id: str):
+    """
+    (sort_column DESC, id_column DESC) 排序下，位于游标之后的行。
+    MySQL 倒序时 NULL 排在最后，所以 NULL 视为最小值。
+    """
+    if sort_value is None:
+        return and_(sort_column.is_(None), id_column < row_id)
+    return or_(
+        sort_column < sort_value,
+        and_(sort_column == sort_value, id_column < row_id),
+        sort_column.is_(None),
+    )
+
+
+class CountCache:
+    """按查询条件缓存 count 结果，过期后重新统计"""
+
+    def __init__(self, ttl: int = COUNT_CACHE_TTL, maxsize: int = COUNT_CACHE_SIZE) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[int]]) -> int:
+        now = time.monotonic()
+        item = self._data.get(key)
+        if item and item[1] > now:
+            self._data.move_to_end(key)
+            return item[0]
+
+        value = await compute()
+        self._data[key] = (value, now + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._data.clear()
+
+
+count_cache = CountCache()
@@ -0,0 +1,130 @@
+"""
+开发/排查用的 SQL 剖析，设置 DB_PROFILE=1 时启用（默认关闭，不影响线上开销）：
+    慢查询日志    单条 SQL 超过 SLOW_QUERY_MS 时记录耗时、路由和语句
+    N+1 检测      一个请求内同一形状的语句执行超过 N_PLUS_ONE_THRESHOLD 次时告警
+    响应头        X-DB-Query-Count / X-DB-Time-Ms
+语句形状：去掉参数值，IN (%s, %s, ...) 折叠为 IN (...)，只按结构比较。
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from common.metrics import route_path
+from db.db import engine
+
+PROFILE_ENABLED = os.getenv('DB_PROFILE', '0') == '1'
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 10))
+# 日志里语句的最大长度
+MAX_STATEMENT_LENGTH = 2000
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+def statement_shape(statement: str) -> str:
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _STRING_LITERAL.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    return _PLACEHOLDER_LIST.sub('(...)', shape)
+
+
+class RequestProfile:
+
+    def __init__(self, method: str, route: str) -> None:
+        self.method = method
+        self.route = route
+        self.queries = 0
+        self.time = 0.0
+        self.shapes = Counter()
+
+
+request_profile: ContextVar[Optional[RequestProfile]] = ContextVar('request_profile', default=None)
+
+
+def _truncate(statement: str) -> str:
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        return statement[:MAX_STATEMENT_LENGTH] + '...'
+    return statement
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('profile_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['profile_start'].pop()
+    profile = request_profile.get()
+    if profile is not None:
+        profile.queries += 1
+        profile.time += elapsed
+        profile.shapes[statement_shape(statement)] += 1
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        route = f"{profile.method} {profile.route}" if profile else "background"
+        logger.warning("Slow query %.1f ms on %s: %s", elapsed * 1000, route, _truncate(statement))
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('profile_start'):
+        conn.info['profile_start'].pop()
+
+
+def install_profiling():
+    """在共享 engine 上注册剖析用的事件，只在 DB_PROFILE=1 时由 main 调用"""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def _report_repeated(profile: RequestProfile):
+    for shape, count in profile.shapes.most_common():
+        if count <= N_PLUS_ONE_THRESHOLD:
+            break
+        logger.warning("Possible N+1 on %s %s: statement executed %d times: %s",
+                       profile.method, profile.route, count, _truncate(shape))
+
+
+class ProfilingMiddleware:
+    """记录每个请求的 SQL，响应头带上条数和耗时，请求结束时检查重复语句"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], route_path(scope))
+        token = request_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # 流式响应在开始发送之后的查询不计入响应头，但仍参与 N+1 检测
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(profile.queries).encode()))
+                headers.append((b"x-db-time-ms", f"{profile.time * 1000:.1f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_profile.reset(token)
+            _report_repeated(profile)
@@ -0,0 +1,63 @@
+import os
+from typing import Iterable, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.grade_import import create_missing_students
+from common.grade_reader import CSV_EXTENSIONS, EXCEL_EXTENSIONS, NAME_COLUMN, GradeFileFormatError, iter_rows
+from common.student_resolver import student_resolver
+
+TEXT_EXTENSIONS = ('.txt',)
+
+
+def _iter_text_names(file_name: str) -> Iterable[str]:
+    # 与 common/demo.txt 相同的格式：每行一个姓名
+    with open(file_name, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            yield line.strip()
+
+
+def _iter_table_names(file_name: str) -> Iterable[str]:
+    # 有 姓名 表头时取该列，否则把第一列都当作姓名
+    rows = iter_rows(file_name)
+    header = next(rows, None)
+    if header is None:
+        return
+    header = [str(cell).strip() if cell is not None else '' for cell in header]
+    if NAME_COLUMN in header:
+        name_idx = header.index(NAME_COLUMN)
+    else:
+        name_idx = 0
+        yield header[0] if header else ''
+    for row in rows:
+        if len(row) > name_idx and row[name_idx] is not None:
+            yield str(row[name_idx]).strip()
+
+
+def read_roster_names(file_name: str) -> List[str]:
+    """读取花名册（txt/csv/xlsx）中的姓名，去掉空行和文件内的重复姓名，保持原顺序"""
+    ext = os.path.splitext(file_name)[1].lower()
+    if ext in TEXT_EXTENSIONS:
+        names = _iter_text_names(file_name)
+    elif ext in CSV_EXTENSIONS or ext in EXCEL_EXTENSIONS:
+        names = _iter_table_names(file_name)
+    else:
+        raise GradeFileFormatError(f"Unsupported file type: {ext}")
+    names = [name for name in dict.fromkeys(names) if name]
+    if not names:
+        raise GradeFileFormatError("File contains no student names")
+    return names
+
+
+async def import_roster(session: AsyncSession, class_id: str, names: List[str]) -> dict:
+    """
+    从按班级缓存的姓名索引找出班级里已有的同名学生，其余批量插入。不提交事务，由调用方 commit。
+    返回新建学生的 {name: student_id} 和已存在的姓名。
+    """
+    students = await student_resolver.class_students(session, class_id)
+    existing = set(students)
+    await create_missing_students(session, class_id, names, students)
+    return {
+        "created": {name: students[name] for name in names if name not in existing},
+        "existing": [name for name in names if name in existing],
+    }
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from model.db_model import DbStudent
+
+# 多进程部署时其他 worker 的写入在过期后才能看到
+STUDENT_RESOLVER_TTL = int(os.getenv('STUDENT_RESOLVER_TTL', 300))
+# 最多缓存的班级数，超出后淘汰最久未使用的班级
+STUDENT_RESOLVER_MAX_CLASSES = int(os.getenv('STUDENT_RESOLVER_MAX_CLASSES', 512))
+
+
+class StudentResolver:
+    """
+    按班级缓存 姓名 -> 学生 id，写成绩时不用再逐条查库。
+    某个班级第一次用到时整班加载一次；学生的增删改由对应接口同步更新或失效。
+    同班重名时与 resolve_students 一致，取最早创建的学生。
+    """
+
+    def __init__(self, ttl: int = STUDENT_RESOLVER_TTL, max_classes: int = STUDENT_RESOLVER_MAX_CLASSES) -> None:
+        self.ttl = ttl
+        self.max_classes = max_classes
+        self._classes = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def _get_loaded(self, class_id: str) -> Optional[dict]:
+        item = self._classes.get(class_id)
+        if item is None or time.monotonic() - item[0] >= self.ttl:
+            return None
+        self._classes.move_to_end(class_id)
+        return item[1]
+
+    async def _load(self, session: AsyncSession, class_id: str) -> dict:
+        students = self._get_loaded(class_id)
+        if students is not None:
+            return students
+        async with self._lock:
+            students = self._get_loaded(class_id)
+            if students is not None:
+                return students
+            rows = await session.execute(
+                select(DbStudent.id, DbStudent.name)
+                .where(DbStudent.class_id == class_id)
+                .order_by(DbStudent.created_time)
+            )
+            students = {}
+            for student_id, name in rows:
+                students.setdefault(name, student_id)
+            self._classes[class_id] = (time.monotonic(), students)
+            while len(self._classes) > self.max_classes:
+                self._classes.popitem(last=False)
+            return students
+
+    async def class_students(self, session: AsyncSession, class_id: str) -> dict:
+        """返回班级 {姓名: 学生 id} 的副本，调用方可以在事务内往里添加新建的学生"""
+        return dict(await self._load(session, class_id))
+
+    async def resolve(self, session: AsyncSession, class_id: str, name: str) -> Optional[str]:
+        return (await self._load(session, class_id)).get(name)
+
+    def add(self, class_id: str, name: str, student_id: str):
+        """事务提交后调用；班级未加载时不处理，下次用到时从库里加载"""
+        item = self._classes.get(class_id)
+        if item is not None:
+            item[1].setdefault(name, student_id)
+
+    def invalidate(self, class_id: Optional[str] = None):
+        if class_id is None:
+            self._classes.clear()
+        else:
+            self._classes.pop(class_id, None)
+
+
+student_resolver = StudentResolver()
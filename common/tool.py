@@ -11,3 +11,13 @@ def handle_nan(value):
     if isinstance(value, float) and math.isnan(value):
         return None
     return value
+
+
+# MySQL 唯一键冲突的错误码
+DUPLICATE_KEY_ERRNO = 1062
+
+
+def is_duplicate_key(error, key_name: str) -> bool:
+    """IntegrityError 是否为指定唯一键的重复冲突（外键、非空等其他完整性错误返回 False）"""
+    args = getattr(getattr(error, 'orig', None), 'args', ())
+    return len(args) >= 2 and args[0] == DUPLICATE_KEY_ERRNO and key_name in str(args[1])
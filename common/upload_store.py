@@ -0,0 +1,325 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from common.grade_reader import CSV_EXTENSIONS, EXCEL_EXTENSIONS
+from common.roster_import import TEXT_EXTENSIONS
+from common.tool import generate_uuid
+from db.db import SessionLocal
+from model.db_model import DbUploadFile
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart 0.0.13 之前的包名
+    from multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_DIR = os.getenv('UPLOAD_DIR', './file')
+# 上传文件保留的秒数，过期后由后台任务删除
+UPLOAD_TTL = int(os.getenv('UPLOAD_TTL', 7 * 24 * 3600))
+UPLOAD_SWEEP_INTERVAL = int(os.getenv('UPLOAD_SWEEP_INTERVAL', 3600))
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', 20 * 1024 * 1024))
+# multipart 的边界和字段头等开销上限，请求体超过 UPLOAD_MAX_SIZE 加上它时直接拒绝
+MULTIPART_OVERHEAD = 64 * 1024
+# multipart 请求中文件字段的名称
+UPLOAD_FIELD = b'file'
+# 按文件开头的内容校验类型时读取的字节数
+CONTENT_HEAD_SIZE = 64 * 1024
+ALLOWED_EXTENSIONS = EXCEL_EXTENSIONS + CSV_EXTENSIONS + TEXT_EXTENSIONS
+# xlsx/xlsm 是 zip 包
+ZIP_MAGIC = b'PK\x03\x04'
+# 每次清理最多处理的过期记录数
+SWEEP_BATCH = 500
+
+logger = logging.getLogger(__name__)
+
+if not os.path.exists(UPLOAD_DIR):
+    os.makedirs(UPLOAD_DIR)
+
+
+def upload_path(file_id: str, file_name: str) -> str:
+    # 保留原文件名，导入时按扩展名判断文件类型
+    return os.path.join(UPLOAD_DIR, f"{file_id}_{os.path.basename(file_name)}")
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class UploadTypeError(ValueError):
+    pass
+
+
+def check_extension(file_name: str):
+    ext = os.path.splitext(file_name)[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise UploadTypeError(f"Unsupported file type: {ext or file_name}. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
+
+
+def check_content(file_name: str, head: bytes):
+    """按文件开头的内容校验类型，不等整个文件传完"""
+    ext = os.path.splitext(file_name)[1].lower()
+    if ext in EXCEL_EXTENSIONS:
+        if not head.startswith(ZIP_MAGIC):
+            raise UploadTypeError("File content is not an Excel workbook")
+    elif b'\x00' in head:
+        raise UploadTypeError("File content is not text")
+
+
+def _write_chunk(f, sha256, chunk: bytes):
+    sha256.update(chunk)
+    f.write(chunk)
+
+
+class _MultipartUpload:
+    """
+    multipart 解析回调：解析到文件字段的头时立即校验扩展名，文件数据只做计数并暂存，
+    由 _receive_upload 每收到一块请求体后写盘。其他字段忽略。
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.file_name = None
+        self.content_type = None
+        self.size = 0
+        self.finished = False
+        self.head = b''
+        self.checked = False
+        self.pending = []
+        self._in_file = False
+        self._headers = {}
+        self._header_name = b''
+        self._header_value = b''
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b''
+        self._header_value = b''
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b'content-disposition', b''))
+        # 只取第一个名为 file 的文件字段
+        if self.file_name is not None or options.get(b'name') != UPLOAD_FIELD or b'filename' not in options:
+            return
+        self.file_name = os.path.basename(options[b'filename'].decode('utf-8', 'replace'))
+        check_extension(self.file_name)
+        content_type = self._headers.get(b'content-type')
+        self.content_type = content_type.decode('latin-1') if content_type else None
+        self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._in_file:
+            return
+        self.size += end - start
+        if self.size > self.max_size:
+            raise UploadTooLargeError(f"File exceeds the maximum upload size of {self.max_size} bytes")
+        self.pending.append(data[start:end])
+
+    def on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self.finished = True
+
+    def take_pending(self) -> bytes:
+        data = b''.join(self.pending)
+        self.pending.clear()
+        # 文件开头凑够 CONTENT_HEAD_SIZE 字节（或文件已结束）时按内容校验类型
+        if not self.checked:
+            self.head += data[:CONTENT_HEAD_SIZE - len(self.head)]
+            if len(self.head) >= CONTENT_HEAD_SIZE or self.finished:
+                check_content(self.file_name, self.head)
+                self.checked = True
+        return data
+
+
+async def _receive_upload(stream: AsyncIterator[bytes], content_type: str, path: str,
+                          max_size: int) -> Tuple[_MultipartUpload, str]:
+    """
+    直接从请求体流式解析 multipart，文件数据边收边写入 path 并计算 sha256，
+    不经过 Starlette 的表单解析（它会先把整个请求体缓存到临时文件）。
+    扩展名、文件开头的内容和大小都在收到对应的字节时校验，超限后不再读取剩余的请求体，并删除已写部分。
+    """
+    media_type, params = parse_options_header(content_type or '')
+    if media_type != b'multipart/form-data' or not params.get(b'boundary'):
+        raise ValueError("Expected a multipart/form-data request")
+
+    upload = _MultipartUpload(max_size)
+    parser = MultipartParser(params[b'boundary'], upload.callbacks())
+    sha256 = hashlib.sha256()
+    received = 0
+    f = await run_in_threadpool(open, path, 'wb')
+    try:
+        async for chunk in stream:
+            received += len(chunk)
+            if received > max_size + MULTIPART_OVERHEAD:
+                raise UploadTooLargeError(f"File exceeds the maximum upload size of {max_size} bytes")
+            parser.write(chunk)
+            if upload.pending or upload.finished and not upload.checked:
+                data = upload.take_pending()
+                if data:
+                    await run_in_threadpool(_write_chunk, f, sha256, data)
+        parser.finalize()
+        if not upload.finished:
+            raise ValueError(f"Missing file field '{UPLOAD_FIELD.decode()}'")
+    except BaseException:
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(_remove_files, [path])
+        raise
+    await run_in_threadpool(f.close)
+    return upload, sha256.hexdigest()
+
+
+async def _find_by_checksum(session: AsyncSession, checksum: str, size: int) -> Optional[DbUploadFile]:
+    uploads = (await session.execute(
+        select(DbUploadFile)
+        .where(DbUploadFile.checksum == checksum, DbUploadFile.size == size,
+               DbUploadFile.expires_time > datetime.now())
+    )).scalars()
+    for upload in uploads:
+        if os.path.exists(upload.path):
+            return upload
+    return None
+
+
+async def save_upload(session: AsyncSession, stream: AsyncIterator[bytes], content_type: str,
+                      max_size: int = UPLOAD_MAX_SIZE):
+    """
+    从 multipart 请求体保存上传文件并登记到 upload_file 索引，不提交事务。
+    内容相同（sha256 一致）且未过期的文件已存在时不再保存，返回已有的记录并顺延过期时间。
+    返回 (记录, 是否为重复上传)
+    """
+    file_id = generate_uuid()
+    # 文件名要解析到文件字段的头才知道，先写到按 file_id 命名的临时文件
+    part_path = os.path.join(UPLOAD_DIR, f"{file_id}.part")
+    received, checksum = await _receive_upload(stream, content_type, part_path, max_size)
+    file_name = received.file_name
+    path = upload_path(file_id, file_name)
+
+    now = datetime.now()
+    existing = await _find_by_checksum(session, checksum, received.size)
+    if existing is not None:
+        await run_in_threadpool(_remove_files, [part_path])
+        existing.expires_time = max(existing.expires_time, now + timedelta(seconds=UPLOAD_TTL))
+        return existing, True
+
+    await run_in_threadpool(os.replace, part_path, path)
+    upload = DbUploadFile(
+        id=file_id,
+        file_name=file_name,
+        path=path,
+        size=received.size,
+        checksum=checksum,
+        content_type=received.content_type,
+        created_time=now,
+        expires_time=now + timedelta(seconds=UPLOAD_TTL),
+    )
+    session.add(upload)
+    return upload, False
+
+
+async def get_upload_path(session: AsyncSession, file_id: str) -> Optional[str]:
+    """按 file_id 主键查出文件路径，过期或文件已不存在时返回 None"""
+    upload = await session.get(DbUploadFile, file_id)
+    if upload is None or upload.expires_time <= datetime.now() or not os.path.exists(upload.path):
+        return None
+    return upload.path
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_orphans(known: set, before: float) -> int:
+    # 没有索引记录的旧文件（建索引之前上传的、登记失败的），按修改时间过期
+    removed = 0
+    for entry in os.scandir(UPLOAD_DIR):
+        if entry.is_file() and os.path.normpath(entry.path) not in known and entry.stat().st_mtime < before:
+            _remove_files([entry.path])
+            removed += 1
+    return removed
+
+
+async def sweep_expired() -> int:
+    """删除过期的上传文件及其索引记录，返回删除的文件数"""
+    removed = 0
+    async with SessionLocal() as session:
+        while True:
+            rows = (await session.execute(
+                select(DbUploadFile.id, DbUploadFile.path)
+                .where(DbUploadFile.expires_time <= datetime.now())
+                .limit(SWEEP_BATCH)
+            )).all()
+            if not rows:
+                break
+            await run_in_threadpool(_remove_files, [row.path for row in rows])
+            await session.execute(delete(DbUploadFile).where(DbUploadFile.id.in_([row.id for row in rows])))
+            await session.commit()
+            removed += len(rows)
+
+        known = set((await session.execute(select(DbUploadFile.path))).scalars())
+    before = (datetime.now() - timedelta(seconds=UPLOAD_TTL)).timestamp()
+    removed += await run_in_threadpool(_remove_orphans, {os.path.normpath(path) for path in known}, before)
+    return removed
+
+
+class UploadSweeper:
+    """后台定期清理过期上传文件，随应用启动和关闭"""
+
+    def __init__(self, interval: int = UPLOAD_SWEEP_INTERVAL) -> None:
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            # 不继承启动时的上下文，清理任务的 SQL 按后台查询统计
+            self._task = asyncio.create_task(self._loop(), context=contextvars.Context())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                removed = await sweep_expired()
+                if removed:
+                    logger.info("Removed %d expired uploads", removed)
+            except Exception:
+                logger.exception("Failed to sweep expired uploads")
+            await asyncio.sleep(self.interval)
+
+
+upload_sweeper = UploadSweeper()
@@ -0,0 +1,192 @@
+"""
+版本化的表结构迁移，已执行的版本记录在 schema_version 表中。
+
+用法:
+    python -m db.migrations            # 升级到最新版本
+    python -m db.migrations --show     # 查看当前版本
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import text
+
+from db.db import engine, dispose_engine
+
+# (版本号, 说明, SQL 列表)，只能追加，不能修改已发布的版本
+MIGRATIONS = [
+    (1, "indexes for grade query patterns and unique grade per student exam", [
+        # 建唯一约束前先去掉重复成绩，保留最近录入的一条。date 可为空，空日期视为最早，
+        # 日期相同（包括都为空）时按 id 保留一条，否则含空日期的重复会留下来导致建约束失败
+        """
+        DELETE g1 FROM grade g1
+        JOIN grade g2
+          ON g1.student_id = g2.student_id
+         AND g1.year = g2.year
+         AND g1.semester = g2.semester
+         AND g1.exam = g2.exam
+         AND (COALESCE(g1.date, '1000-01-01') < COALESCE(g2.date, '1000-01-01')
+              OR (COALESCE(g1.date, '1000-01-01') = COALESCE(g2.date, '1000-01-01') AND g1.id < g2.id))
+        """,
+        "ALTER TABLE grade ADD CONSTRAINT uq_grade_student_exam UNIQUE (student_id, year, semester, exam)",
+        "CREATE INDEX ix_grade_class_exam ON grade (class_id, year, semester, exam)",
+        "CREATE INDEX ix_grade_date ON grade (date, id)",
+        "CREATE INDEX ix_student_name ON student (name)",
+        "CREATE INDEX ix_student_class_name ON student (class_id, name)",
+        "CREATE INDEX ix_student_created_time ON student (created_time, id)",
+    ]),
+    (2, "grade_summary table for incremental exam statistics", [
+        """
+        CREATE TABLE grade_summary (
+            class_id VARCHAR(64) NOT NULL,
+            year VARCHAR(16) NOT NULL,
+            semester VARCHAR(16) NOT NULL,
+            exam VARCHAR(16) NOT NULL,
+            score_count INT NOT NULL DEFAULT 0,
+            score_sum DOUBLE NOT NULL DEFAULT 0,
+            score_sq_sum DOUBLE NOT NULL DEFAULT 0,
+            pass_count INT NOT NULL DEFAULT 0,
+            min_score DOUBLE NULL,
+            max_score DOUBLE NULL,
+            bucket_0 INT NOT NULL DEFAULT 0,
+            bucket_1 INT NOT NULL DEFAULT 0,
+            bucket_2 INT NOT NULL DEFAULT 0,
+            bucket_3 INT NOT NULL DEFAULT 0,
+            bucket_4 INT NOT NULL DEFAULT 0,
+            bucket_5 INT NOT NULL DEFAULT 0,
+            bucket_6 INT NOT NULL DEFAULT 0,
+            bucket_7 INT NOT NULL DEFAULT 0,
+            bucket_8 INT NOT NULL DEFAULT 0,
+            bucket_9 INT NOT NULL DEFAULT 0,
+            stale BOOLEAN NOT NULL DEFAULT FALSE,
+            updated_time DATETIME NULL,
+            PRIMARY KEY (class_id, year, semester, exam)
+        )
+        """,
+        # 按当时的默认规则（及格 60 分、满分 100、10 个分数段）回填；之后如果修改了 PASS_SCORE/FULL_SCORE，
+        # 用 python -m common.grade_summary --rebuild 按新规则重建。迁移只用 SQL，不依赖应用代码
+        """
+        INSERT INTO grade_summary (class_id, year, semester, exam, score_count, score_sum, score_sq_sum, pass_count,
+                                   min_score, max_score, bucket_0, bucket_1, bucket_2, bucket_3, bucket_4, bucket_5,
+                                   bucket_6, bucket_7, bucket_8, bucket_9, stale, updated_time)
+        SELECT class_id, year, semester, exam,
+            COUNT(score),
+            SUM(score),
+            SUM(score * score),
+            SUM(CASE WHEN score >= 60 THEN 1 ELSE 0 END),
+            MIN(score),
+            MAX(score),
+            SUM(CASE WHEN LEAST(GREATEST(FLOOR(score * 10 / 100), 0), 9) = 0 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN LEAST(GREATEST(FLOOR(score * 10 / 100), 0), 9) = 1 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN LEAST(GREATEST(FLOOR(score * 10 / 100), 0), 9) = 2 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN LEAST(GREATEST(FLOOR(score * 10 / 100), 0), 9) = 3 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN LEAST(GREATEST(FLOOR(score * 10 / 100), 0), 9) = 4 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN LEAST(GREATEST(FLOOR(score * 10 / 100), 0), 9) = 5 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN LEAST(GREATEST(FLOOR(score * 10 / 100), 0), 9) = 6 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN LEAST(GREATEST(FLOOR(score * 10 / 100), 0), 9) = 7 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN LEAST(GREATEST(FLOOR(score * 10 / 100), 0), 9) = 8 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN LEAST(GREATEST(FLOOR(score * 10 / 100), 0), 9) = 9 THEN 1 ELSE 0 END),
+            FALSE,
+            NOW()
+        FROM grade
+        WHERE score IS NOT NULL AND class_id IS NOT NULL AND year IS NOT NULL AND semester IS NOT NULL
+          AND exam IS NOT NULL
+        GROUP BY class_id, year, semester, exam
+        """,
+    ]),
+    (3, "index for exam-wide ranking", [
+        "CREATE INDEX ix_grade_exam_score ON grade (year, semester, exam, score)",
+    ]),
+    (4, "upload_file index for uploaded files", [
+        """
+        CREATE TABLE upload_file (
+            id VARCHAR(64) NOT NULL PRIMARY KEY,
+            file_name VARCHAR(255) NOT NULL,
+            path VARCHAR(512) NOT NULL,
+            size BIGINT NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            content_type VARCHAR(255) NULL,
+            created_time DATETIME NOT NULL,
+            expires_time DATETIME NOT NULL
+        )
+        """,
+        "CREATE INDEX ix_upload_file_checksum ON upload_file (checksum)",
+        "CREATE INDEX ix_upload_file_expires_time ON upload_file (expires_time)",
+    ]),
+    (5, "import_job table shared by all workers", [
+        """
+        CREATE TABLE import_job (
+            id VARCHAR(64) NOT NULL PRIMARY KEY,
+            file_id VARCHAR(64) NOT NULL,
+            class_id VARCHAR(64) NOT NULL,
+            year VARCHAR(16) NOT NULL,
+            semester VARCHAR(16) NOT NULL,
+            exam VARCHAR(16) NOT NULL,
+            status VARCHAR(16) NOT NULL,
+            rows_processed INT NOT NULL DEFAULT 0,
+            students_created INT NOT NULL DEFAULT 0,
+            rows_per_sec DOUBLE NULL,
+            errors TEXT NULL,
+            created_time DATETIME NOT NULL,
+            started_time DATETIME NULL,
+            finished_time DATETIME NULL,
+            updated_time DATETIME NOT NULL,
+            CONSTRAINT uq_import_job_params UNIQUE (file_id, class_id, year, semester, exam)
+        )
+        """,
+    ]),
+]
+
+CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_time DATETIME NOT NULL
+)
+"""
+
+
+async def current_version(conn) -> int:
+    await conn.execute(text(CREATE_VERSION_TABLE))
+    version = await conn.scalar(text("SELECT MAX(version) FROM schema_version"))
+    return version or 0
+
+
+async def upgrade() -> int:
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+        await conn.commit()
+
+        for number, description, statements in MIGRATIONS:
+            if number <= version:
+                continue
+            print(f"Applying migration {number}: {description}")
+            # MySQL 的 DDL 会隐式提交，每条语句单独执行，最后再记录版本
+            for statement in statements:
+                await conn.execute(text(statement))
+            await conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_time) VALUES (:v, :d, :t)"),
+                {"v": number, "d": description, "t": datetime.now()}
+            )
+            await conn.commit()
+            version = number
+    return version
+
+
+async def _main(show: bool):
+    try:
+        if show:
+            async with engine.connect() as conn:
+                print(f"Current schema version: {await current_version(conn)}")
+                await conn.commit()
+        else:
+            print(f"Schema is at version {await upgrade()}")
+    finally:
+        await dispose_engine()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--show", action="store_true", help="only print the current schema version")
+    args = parser.parse_args()
+    asyncio.run(_main(args.show))
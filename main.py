@@ -1,10 +1,27 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from common.import_job import import_jobs
+from common.metrics import MetricsMiddleware
+from common.profiling import PROFILE_ENABLED, ProfilingMiddleware, install_profiling
+from common.upload_store import upload_sweeper
+from db.db import dispose_engine
 from router.api import router as api_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    upload_sweeper.start()
+    yield
+    await upload_sweeper.stop()
+    await import_jobs.shutdown()
+    await dispose_engine()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["http://localhost:8083"]
 
@@ -15,6 +32,12 @@ app.add_middleware(
     allow_methods=["*"],  # 允许所有 HTTP 方法
     allow_headers=["*"],  # 允许所有头部
 )
+# 请求数、耗时、每个请求的 SQL 统计，/metrics 输出
+app.add_middleware(MetricsMiddleware)
+# DB_PROFILE=1 时记录慢查询、检测 N+1，并在响应头返回 SQL 条数和耗时
+if PROFILE_ENABLED:
+    install_profiling()
+    app.add_middleware(ProfilingMiddleware)
 
 app.include_router(api_router)
 
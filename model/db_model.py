@@ -1,6 +1,7 @@
 import uuid
 
-from sqlalchemy import Column, Float, ForeignKey, String, DateTime
+from sqlalchemy import BigInteger, Boolean, Column, Float, ForeignKey, Integer, String, DateTime, Index, Text, \
+    UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -24,6 +25,12 @@ class DbStudent(Base):
     class_ = relationship('DbTbClass', back_populates='students')
     grades = relationship('DbGrade', back_populates='student', cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ix_student_name', 'name'),
+        Index('ix_student_class_name', 'class_id', 'name'),
+        Index('ix_student_created_time', 'created_time', 'id'),
+    )
+
 
 class DbGrade(Base):
     __tablename__ = 'grade'
@@ -36,3 +43,85 @@ class DbGrade(Base):
     student_id = Column(String, ForeignKey('student.id'), nullable=True)
     class_id = Column(String, ForeignKey('tb_class.id'))
     student = relationship('DbStudent', back_populates='grades')
+
+    __table_args__ = (
+        # 同一学生同一场考试只有一条成绩，导入时据此 upsert；也覆盖 (student_id, year, semester) 查询
+        UniqueConstraint('student_id', 'year', 'semester', 'exam', name='uq_grade_student_exam'),
+        Index('ix_grade_class_exam', 'class_id', 'year', 'semester', 'exam'),
+        Index('ix_grade_date', 'date', 'id'),
+        # 排名：按考试过滤后按分数排序
+        Index('ix_grade_exam_score', 'year', 'semester', 'exam', 'score'),
+    )
+
+
+class DbGradeSummary(Base):
+    """按 (班级, 学年, 学期, 考试) 汇总的成绩统计，随成绩写入增量维护"""
+    __tablename__ = 'grade_summary'
+    class_id = Column(String, primary_key=True)
+    year = Column(String, primary_key=True)
+    semester = Column(String, primary_key=True)
+    exam = Column(String, primary_key=True)
+    score_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0)
+    score_sq_sum = Column(Float, nullable=False, default=0)
+    pass_count = Column(Integer, nullable=False, default=0)
+    min_score = Column(Float, nullable=True)
+    max_score = Column(Float, nullable=True)
+    bucket_0 = Column(Integer, nullable=False, default=0)
+    bucket_1 = Column(Integer, nullable=False, default=0)
+    bucket_2 = Column(Integer, nullable=False, default=0)
+    bucket_3 = Column(Integer, nullable=False, default=0)
+    bucket_4 = Column(Integer, nullable=False, default=0)
+    bucket_5 = Column(Integer, nullable=False, default=0)
+    bucket_6 = Column(Integer, nullable=False, default=0)
+    bucket_7 = Column(Integer, nullable=False, default=0)
+    bucket_8 = Column(Integer, nullable=False, default=0)
+    bucket_9 = Column(Integer, nullable=False, default=0)
+    # 删除了最高/最低分后 min/max 需要重新统计
+    stale = Column(Boolean, nullable=False, default=False)
+    updated_time = Column(DateTime, nullable=True)
+
+
+class DbUploadFile(Base):
+    """上传文件索引，按 file_id 直接查到文件路径，过期文件由后台任务清理"""
+    __tablename__ = 'upload_file'
+    id = Column(String, primary_key=True)
+    file_name = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    checksum = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    created_time = Column(DateTime, nullable=False)
+    expires_time = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_upload_file_checksum', 'checksum'),
+        Index('ix_upload_file_expires_time', 'expires_time'),
+    )
+
+
+class DbImportJob(Base):
+    """成绩导入任务，存在库里以便各 worker 都能查询进度、重启后仍能按参数去重"""
+    __tablename__ = 'import_job'
+    id = Column(String, primary_key=True)
+    file_id = Column(String, nullable=False)
+    class_id = Column(String, nullable=False)
+    year = Column(String, nullable=False)
+    semester = Column(String, nullable=False)
+    exam = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    students_created = Column(Integer, nullable=False, default=0)
+    rows_per_sec = Column(Float, nullable=True)
+    # JSON 数组
+    errors = Column(Text, nullable=True)
+    created_time = Column(DateTime, nullable=False)
+    started_time = Column(DateTime, nullable=True)
+    finished_time = Column(DateTime, nullable=True)
+    # 进度每次写入时更新，长时间未更新的 pending/running 任务视为进程已退出
+    updated_time = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # 同一文件导入到同一场考试只有一个任务
+        UniqueConstraint('file_id', 'class_id', 'year', 'semester', 'exam', name='uq_import_job_params'),
+    )
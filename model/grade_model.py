@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -65,3 +66,57 @@ class StudentGradeCompareModel(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ImportJobModel(BaseModel):
+    id: str
+    file_id: str
+    class_id: str
+    year: str
+    semester: str
+    exam: str
+    status: str = "pending"
+    rows_processed: int = 0
+    students_created: int = 0
+    rows_per_sec: Optional[float] = None
+    errors: List[str] = []
+    created_time: datetime
+    started_time: Optional[datetime] = None
+    finished_time: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class StudentTrendQueryModel(BaseModel):
+    class_id: Optional[str] = None
+    student_ids: Optional[List[str]] = None
+    start_year: str
+    start_semester: str
+    end_year: str
+    end_semester: str
+
+    class Config:
+        from_attributes = True
+
+
+class BatchGradeItemModel(BaseModel):
+    # 带 id 为修改已有成绩，不带 id 时按 (姓名, 班级) 新增
+    id: Optional[str] = None
+    name: Optional[str] = None
+    class_id: str
+    year: str
+    semester: str
+    exam: str
+    score: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class BatchGradeModel(BaseModel):
+    upserts: List[BatchGradeItemModel] = []
+    deletes: List[str] = []
+
+    class Config:
+        from_attributes = True
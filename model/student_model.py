@@ -27,3 +27,11 @@ class StudentGradeResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ImportRosterModel(BaseModel):
+    file_id: str
+    class_id: str
+
+    class Config:
+        from_attributes = True
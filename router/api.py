@@ -1,8 +1,9 @@
 from fastapi import APIRouter
 
-from router import student, grade, common
+from router import student, grade, common, metrics
 
 router = APIRouter()
 router.include_router(student.router)
 router.include_router(grade.router)
 router.include_router(common.router)
+router.include_router(metrics.router)
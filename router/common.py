@@ -1,10 +1,10 @@
-import os
-import shutil
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi import APIRouter, HTTPException
-from fastapi import File, UploadFile
-
-from common.tool import generate_uuid
+from common.cache import query_cache
+from common.upload_store import MULTIPART_OVERHEAD, UPLOAD_MAX_SIZE, UploadTooLargeError, UploadTypeError, \
+    save_upload
+from db.db import get_session, pool_stats
 from model.response import APIResponse
 
 router = APIRouter(
@@ -13,30 +13,73 @@ router = APIRouter(
     responses={404: {"description": "404 Not Found"}},
 )
 
-UPLOAD_DIR = "./file"
-
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
+# upload-file 自己解析请求体，在文档中补上请求体的描述
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
 
 
-@router.post("/upload-file")
-async def upload_file(file: UploadFile = File(...)):
-    # 生成唯一的文件 ID
-    file_id = str(generate_uuid())
-    file_location = os.path.join(UPLOAD_DIR, file_id + "_" + file.filename)
+@router.post("/upload-file", openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_file(request: Request, session: AsyncSession = Depends(get_session)):
+    # 不声明 File(...) 参数：那样 FastAPI 会先把整个请求体解析到临时文件，大小和类型检查都要等传完才执行。
+    # 这里在读取请求体之前先按 Content-Length 拒绝过大的请求，再从 request.stream() 边收边解析边检查
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > UPLOAD_MAX_SIZE + MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"File exceeds the maximum upload size of {UPLOAD_MAX_SIZE} bytes")
 
     try:
-        # 保存文件
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # 分块写盘并计算 sha256，登记到上传索引，导入时按 file_id 直接查到路径
+        upload, duplicated = await save_upload(session, request.stream(), request.headers.get("content-type", ""))
+        await session.commit()
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadTypeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to save file")
 
     return APIResponse(
         status=True,
         data={
-            "file_id": file_id,
+            "file_id": upload.id,
+            "size": upload.size,
+            "checksum": upload.checksum,
+            "duplicated": duplicated,
+            "expires_time": upload.expires_time,
         },
         message="Success",
         code=200
     )
+
+
+@router.get("/db-pool", response_model=APIResponse)
+async def get_db_pool_stats():
+    return APIResponse(
+        status=True,
+        data=pool_stats.snapshot(),
+        message="Success",
+        code=200
+    )
+
+
+@router.get("/cache-stats", response_model=APIResponse)
+async def get_cache_stats():
+    return APIResponse(
+        status=True,
+        data=query_cache.stats.snapshot(),
+        message="Success",
+        code=200
+    )
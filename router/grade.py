@@ -1,28 +1,42 @@
-import os
 from datetime import datetime
 from typing import Optional
 
-import pandas as pd
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import desc
-
-from common.tool import generate_uuid, handle_nan
-from db.db import Database, get_db_session
+from sqlalchemy import and_, desc, func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.cache import cache_key, class_tag, invalidate, query_cache, student_tags
+from common.exam_slots import EXAM_SLOTS, fill_compare_slots, fill_slots, previous_semester, semester_range
+from common.grade_batch import apply_grade_batch
+from common.grade_export import EXPORT_MEDIA_TYPES, stream_export
+from common.grade_stats import compute_stats
+from common.grade_summary import add_score, read_stats, remove_score
+from common.http_cache import check_not_modified
+from common.json_response import api_response
+from common.import_job import import_jobs
+from common.name_index import student_name_index
+from common.pagination import count_cache, decode_cursor, encode_cursor, keyset_after
+from common.student_resolver import student_resolver
+from common.tool import generate_uuid, is_duplicate_key
+from common.upload_store import get_upload_path
+from db.db import get_session
 from model.db_model import DbStudent, DbTbClass, DbGrade
-from model.grade_model import GradeResponse, CreatGradeModel, ImportGradeModel, StudentGradeModel, \
-    StudentGradeCompareModel
+from model.grade_model import CreatGradeModel, ImportGradeModel, StudentTrendQueryModel, \
+    BatchGradeModel
 from model.response import APIResponse
 
+# 同一学生同一场考试只能有一条成绩的唯一键，冲突时返回 409
+GRADE_UNIQUE_KEY = "uq_grade_student_exam"
+
 router = APIRouter(
     prefix="/grade",
     tags=["Grade"],
     responses={404: {"description": "404 Not Found"}},
 )
 
-database = Database()
-engine = database.get_db_connection()
-
 
 class StudentGradeResponse(BaseModel):
     id: str
@@ -34,93 +48,267 @@ class StudentGradeResponse(BaseModel):
         from_attributes = True
 
 
+def grade_list_query(year: Optional[str], semester: Optional[str], exam: Optional[str], class_id: Optional[str]):
+    """成绩列表和导出共用的查询，按成绩日期倒序"""
+    query = (
+        select(
+            DbGrade.id.label('grade_id'),
+            DbGrade.score.label('score'),
+            DbGrade.year.label('year'),
+            DbGrade.semester.label('semester'),
+            DbGrade.exam.label('exam'),
+            DbGrade.date.label('date'),
+            DbStudent.name.label('student_name'),
+            DbTbClass.name.label('class_name'),
+            DbTbClass.id.label('class_id')
+        )
+        .join(DbStudent, DbGrade.student_id == DbStudent.id)
+        .join(DbTbClass, DbGrade.class_id == DbTbClass.id)
+        .order_by(desc(DbGrade.date), desc(DbGrade.id))  # 按成绩日期倒序排序
+    )
+    if year:
+        query = query.filter(DbGrade.year == year)
+
+    if semester:
+        query = query.filter(DbGrade.semester == semester)
+
+    if exam:
+        query = query.filter(DbGrade.exam == exam)
+
+    if class_id:
+        query = query.filter(DbGrade.class_id == class_id)
+    return query
+
+
 @router.get("", response_model=APIResponse)
 async def get_grades(
+        request: Request,
+        response: Response,
         year: Optional[str] = None,
         semester: Optional[str] = None,
         exam: Optional[str] = None,
         class_id: Optional[str] = None,
         name: Optional[str] = None,
         page: int = Query(1, gt=0),
-        page_size: int = Query(10, gt=0, le=100)
+        page_size: int = Query(10, gt=0, le=100),
+        cursor: Optional[str] = None,
+        with_total: bool = True,
+        session: AsyncSession = Depends(get_session)
 ):
-    session = get_db_session(engine)
+    # 传入 cursor（首页传空字符串）时使用游标翻页，页面耗时与翻页深度无关
+    key = cache_key('grade:list', year=year, semester=semester, exam=exam, class_id=class_id, name=name,
+                    page=page, page_size=page_size, cursor=cursor, with_total=with_total)
+    tags = [class_tag(class_id)]
+    not_modified = await check_not_modified(request, response, key, tags)
+    if not_modified:
+        return not_modified
+
+    cached = await query_cache.get(key)
+    if cached is not None:
+        return api_response(cached, response)
+    # 查询前记下标签版本，查询期间有写入时不缓存旧结果
+    versions = await query_cache.get_versions(tags)
+
     try:
-        query = (
-            session.query(
-                DbGrade.id.label('grade_id'),
-                DbGrade.score.label('score'),
-                DbGrade.year.label('year'),
-                DbGrade.semester.label('semester'),
-                DbGrade.exam.label('exam'),
-                DbGrade.date.label('date'),
+        query = grade_list_query(year, semester, exam, class_id)
+        # 通过内存姓名索引解析出学生 id，避免 LIKE '%name%' 全表扫描
+        name_condition = await student_name_index.filter_condition(session, name, DbGrade.student_id)
+        if name_condition is not None:
+            query = query.filter(name_condition)
+
+        total = None
+        if with_total:
+            count_query = select(func.count()).select_from(query.order_by(None).subquery())
+            # 游标翻页每页都带总数，短时间缓存；偏移翻页返回精确总数
+            if cursor is not None:
+                total = await count_cache.get(('grade', year, semester, exam, class_id, name),
+                                              lambda: session.scalar(count_query))
+            else:
+                total = await session.scalar(count_query)
+
+        if cursor is not None:
+            if cursor:
+                cursor_date, cursor_id = decode_cursor(cursor)
+                query = query.filter(keyset_after(DbGrade.date, DbGrade.id, cursor_date, cursor_id))
+            results = (await session.execute(query.limit(page_size))).all()
+        else:
+            results = (await session.execute(query.offset((page - 1) * page_size).limit(page_size))).all()
+
+        # 直接由结果行构造 dict，字段与 GradeResponse 一致，省去逐行的 Pydantic 校验
+        data = [
+            {
+                "id": row.grade_id,
+                "student_name": row.student_name,
+                "year": row.year,
+                "semester": row.semester,
+                "exam": row.exam,
+                "class_name": row.class_name,
+                "class_id": row.class_id,
+                "score": row.score,
+            }
+            for row in results
+        ]
+
+        pagination = {
+            "total_count": total,
+            "page": page,
+            "page_size": page_size,
+        }
+        if cursor is not None:
+            last = results[-1] if len(results) == page_size else None
+            pagination = {
+                "total_count": total,
+                "page_size": page_size,
+                "next_cursor": encode_cursor(last.date, last.grade_id) if last else None,
+            }
+
+        result = {
+            "data": data,
+            "pagination": pagination
+        }
+        await query_cache.set(key, result, tags=tags, versions=versions)
+        return api_response(result, response)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export")
+async def export_grades(
+        year: Optional[str] = None,
+        semester: Optional[str] = None,
+        exam: Optional[str] = None,
+        class_id: Optional[str] = None,
+        name: Optional[str] = None,
+        format: str = Query('csv', pattern='^(csv|xlsx|parquet)$'),
+        session: AsyncSession = Depends(get_session)
+):
+    # 与成绩列表相同的过滤条件，不分页，按批从服务端游标读取并流式返回
+    try:
+        query = grade_list_query(year, semester, exam, class_id)
+        name_condition = await student_name_index.filter_condition(session, name, DbGrade.student_id)
+        if name_condition is not None:
+            query = query.filter(name_condition)
+        content = stream_export(query, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    file_name = f"grades_{datetime.now().strftime('%Y%m%d%H%M%S')}.{format}"
+    return StreamingResponse(content, media_type=EXPORT_MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="{file_name}"'})
+
+
+@router.get("/stats", response_model=APIResponse)
+async def get_grade_stats(
+        class_id: Optional[str] = None,
+        year: Optional[str] = None,
+        semester: Optional[str] = None,
+        exam: Optional[str] = None,
+        exact: bool = False,
+        session: AsyncSession = Depends(get_session)
+):
+    # 精确统计要读出分数算中位数，不允许不带条件扫描整张成绩表
+    if exact and not any((class_id, year, semester, exam)):
+        raise HTTPException(status_code=400, detail="exact=true requires at least one of class_id, year, "
+                                                    "semester or exam")
+    key = cache_key('grade:stats', class_id=class_id, year=year, semester=semester, exam=exam, exact=exact)
+    tags = [class_tag(class_id)]
+    cached = await query_cache.get(key)
+    if cached is not None:
+        return APIResponse(status=True, data=cached, message="Success", code=200)
+    versions = await query_cache.get_versions(tags)
+
+    try:
+        # 默认读增量维护的汇总表（中位数由直方图估算），exact=true 时直接扫描成绩计算
+        if exact:
+            data = await compute_stats(session, class_id, year, semester, exam)
+        else:
+            data = await read_stats(session, class_id, year, semester, exam)
+        await query_cache.set(key, data, tags=tags, versions=versions)
+        return APIResponse(
+            status=True,
+            data=data,
+            message="Success",
+            code=200
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/ranking", response_model=APIResponse)
+async def get_grade_ranking(
+        year: str,
+        semester: str,
+        exam: str,
+        class_id: Optional[str] = None,
+        scope: str = Query('class', pattern='^(class|all)$'),
+        top_n: Optional[int] = Query(None, gt=0),
+        student_id: Optional[str] = None,
+        session: AsyncSession = Depends(get_session)
+):
+    # scope=class 为班级内排名，scope=all 为所选考试全年级排名
+    try:
+        partition = DbGrade.class_id if scope == 'class' else None
+        ranked = (
+            select(
+                DbGrade.student_id.label('student_id'),
                 DbStudent.name.label('student_name'),
+                DbGrade.class_id.label('class_id'),
                 DbTbClass.name.label('class_name'),
-                DbTbClass.id.label('class_id')
+                DbGrade.score.label('score'),
+                func.rank().over(partition_by=partition, order_by=desc(DbGrade.score)).label('rank'),
+                func.percent_rank().over(partition_by=partition, order_by=DbGrade.score).label('percentile'),
+                func.count().over(partition_by=partition).label('total'),
             )
             .join(DbStudent, DbGrade.student_id == DbStudent.id)
             .join(DbTbClass, DbGrade.class_id == DbTbClass.id)
-            .order_by(desc(DbGrade.date))  # 按成绩日期倒序排序
+            .where(DbGrade.year == year, DbGrade.semester == semester, DbGrade.exam == exam,
+                   DbGrade.score.isnot(None))
         )
-        if year:
-            query = query.filter(DbGrade.year == year)
-
-        if semester:
-            query = query.filter(DbGrade.semester == semester)
-
-        if exam:
-            query = query.filter(DbGrade.exam == exam)
-
         if class_id:
-            query = query.filter(DbGrade.class_id == class_id)
-
-        if name:
-            query = query.filter(DbStudent.name.like(f"%{name}%"))
-
-        total = query.count()
+            ranked = ranked.where(DbGrade.class_id == class_id)
+        ranked = ranked.subquery()
 
-        results = query.offset((page - 1) * page_size).limit(page_size).all()
+        order = [ranked.c.class_id, ranked.c.rank] if scope == 'class' else [ranked.c.rank]
+        query = select(ranked).order_by(*order)
+        if top_n:
+            query = query.where(ranked.c.rank <= top_n)
+        if student_id:
+            query = query.where(ranked.c.student_id == student_id)
 
+        rows = (await session.execute(query)).all()
         data = [
-            GradeResponse(
-                id=row.grade_id,
-                score=row.score,
-                year=row.year,
-                semester=row.semester,
-                exam=row.exam,
-                date=row.date,
-                student_name=row.student_name,
-                class_name=row.class_name,
-                class_id=row.class_id
-            )
-            for row in results
+            {
+                "student_id": row.student_id,
+                "student_name": row.student_name,
+                "class_id": row.class_id,
+                "class_name": row.class_name,
+                "score": row.score,
+                "rank": row.rank,
+                "percentile": round(float(row.percentile), 4),
+                "total": row.total,
+            }
+            for row in rows
         ]
-
         return APIResponse(
             status=True,
-            data={
-                "data": data,
-                "pagination": {
-                    "total_count": total,
-                    "page": page,
-                    "page_size": page_size,
-                }
-            },
+            data=data,
             message="Success",
             code=200
         )
-
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("", response_model=APIResponse)
-async def create_grade(grade: CreatGradeModel):
-    session = get_db_session(engine)
+async def create_grade(grade: CreatGradeModel, session: AsyncSession = Depends(get_session)):
     try:
-        student = session.query(DbStudent).filter(DbStudent.name == grade.name).first()
-        student_id = ''
-        if not student:
+        # 在本班内按姓名解析学生，不同班级的重名学生互不影响
+        student_id = await student_resolver.resolve(session, grade.class_id, grade.name)
+        created_student = student_id is None
+        if created_student:
             db_student = DbStudent(id=generate_uuid(), name=grade.name, class_id=grade.class_id,
                                    created_time=datetime.now())
             session.add(db_student)
@@ -133,30 +321,68 @@ async def create_grade(grade: CreatGradeModel):
             semester=grade.semester,
             exam=grade.exam,
             date=datetime.now(),
-            student_id=student.id if student else student_id,
+            student_id=student_id,
             class_id=grade.class_id
         )
         session.add(new_grade)
-        session.commit()
+        await add_score(session, (grade.class_id, grade.year, grade.semester, grade.exam), grade.score)
+        await session.commit()
+        await invalidate(class_ids=[grade.class_id], student_ids=[new_grade.student_id])
+        if created_student:
+            student_name_index.add(student_id, grade.name, grade.class_id)
+            student_resolver.add(grade.class_id, grade.name, student_id)
         return APIResponse(
             status=True,
             data={"id": new_grade.id},
             message="Success",
             code=201
         )
+    except IntegrityError as e:
+        await session.rollback()
+        if is_duplicate_key(e, GRADE_UNIQUE_KEY):
+            raise HTTPException(status_code=409, detail="Grade already exists for this student and exam")
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/batch", response_model=APIResponse)
+async def batch_grades(batch: BatchGradeModel, session: AsyncSession = Depends(get_session)):
+    # 批量新增/修改/删除在一个事务内完成，返回逐条结果
+    try:
+        result = await apply_grade_batch(session, batch)
+        await session.commit()
+        await invalidate(class_ids=result.pop("class_ids"), student_ids=result.pop("student_ids"))
+        if result["students_created"]:
+            student_name_index.invalidate()
+            for class_id in {item.class_id for item in batch.upserts if not item.id}:
+                student_resolver.invalidate(class_id)
+        return APIResponse(
+            status=True,
+            data=result,
+            message="Success",
+            code=200
+        )
+    except IntegrityError as e:
+        await session.rollback()
+        if is_duplicate_key(e, GRADE_UNIQUE_KEY):
+            raise HTTPException(status_code=409, detail="Batch conflicts with an existing grade for the same exam")
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
+        await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/{grade_id}", response_model=APIResponse)
-async def delete_grade(grade_id: str):
-    session = get_db_session(engine)
+async def delete_grade(grade_id: str, session: AsyncSession = Depends(get_session)):
     try:
-        grade = session.query(DbGrade).filter(DbGrade.id == grade_id).first()
+        grade = await session.get(DbGrade, grade_id)
         if not grade:
             raise HTTPException(status_code=404, detail="Grade not found")
-        session.delete(grade)
-        session.commit()
+        await remove_score(session, (grade.class_id, grade.year, grade.semester, grade.exam), grade.score)
+        await session.delete(grade)
+        await session.commit()
+        await invalidate(class_ids=[grade.class_id], student_ids=[grade.student_id])
         return APIResponse(
             status=True,
             data={},
@@ -164,131 +390,158 @@ async def delete_grade(grade_id: str):
             code=200
         )
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{grade_id}", response_model=APIResponse)
-async def update_grade(grade_id: str, grade: CreatGradeModel):
-    session = get_db_session(engine)
+async def update_grade(grade_id: str, grade: CreatGradeModel, session: AsyncSession = Depends(get_session)):
     try:
-        grade_to_update = session.query(DbGrade).filter(DbGrade.id == grade_id).first()
+        grade_to_update = await session.get(DbGrade, grade_id)
         if not grade_to_update:
             raise HTTPException(status_code=404, detail="Grade not found")
+        await remove_score(session, (grade_to_update.class_id, grade_to_update.year, grade_to_update.semester,
+                                     grade_to_update.exam), grade_to_update.score)
         grade_to_update.score = grade.score
         grade_to_update.year = grade.year
         grade_to_update.semester = grade.semester
         grade_to_update.exam = grade.exam
         grade_to_update.date = datetime.now()
-        session.commit()
+        await add_score(session, (grade_to_update.class_id, grade.year, grade.semester, grade.exam), grade.score)
+        await session.commit()
+        await invalidate(class_ids=[grade_to_update.class_id], student_ids=[grade_to_update.student_id])
         return APIResponse(
             status=True,
             data={},
             message="Success",
             code=200
         )
+    except IntegrityError as e:
+        await session.rollback()
+        if is_duplicate_key(e, GRADE_UNIQUE_KEY):
+            raise HTTPException(status_code=409, detail="Grade already exists for this student and exam")
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/import-grades", response_model=APIResponse)
-async def import_grades(gradeImp: ImportGradeModel):
-    session = get_db_session(engine)
-    # 找到上传的文件
-    file_name = None
-    for f in os.listdir('./file'):
-        if f.startswith(gradeImp.file_id):
-            file_name = os.path.join('./file', f)
-            break
-
-    if not file_name or not os.path.exists(file_name):
+async def import_grades(gradeImp: ImportGradeModel, session: AsyncSession = Depends(get_session)):
+    # 按 file_id 从上传索引找到文件
+    file_name = await get_upload_path(session, gradeImp.file_id)
+    if not file_name:
         raise HTTPException(status_code=404, detail="File not found")
 
-    # 读取Excel文件
-    try:
-        df = pd.read_excel(file_name, engine='openpyxl')
-    except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": f"Failed to read Excel file: {str(e)}"})
-
-    # 检查Excel文件的结构
-    if "姓名" not in df.columns or "成绩" not in df.columns:
-        raise HTTPException(status_code=400,
-                            detail="Excel file format incorrect. Required columns: 'student_name', 'score'")
+    # 提交后台导入任务，立即返回任务 id；同一文件以相同参数重复提交时返回已有任务
+    job = await import_jobs.submit(session, gradeImp, file_name)
+    return APIResponse(
+        status=True,
+        data={"job_id": job.id, "status": job.status},
+        message="Accepted",
+        code=202
+    )
+
+
+@router.get("/import-jobs/{job_id}", response_model=APIResponse)
+async def get_import_job(job_id: str, session: AsyncSession = Depends(get_session)):
+    job = await import_jobs.get(session, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return APIResponse(
+        status=True,
+        data=job,
+        message="Success",
+        code=200
+    )
+
+
+@router.post("/student-trends", response_model=APIResponse)
+async def get_student_trends(trend: StudentTrendQueryModel, session: AsyncSession = Depends(get_session)):
+    # 一次查询取出全班（或指定学生）在学期区间内的成绩，附带每学期与上学期的对比
+    if not trend.class_id and not trend.student_ids:
+        raise HTTPException(status_code=400, detail="class_id or student_ids is required")
 
     try:
-        # 遍历文件内容，导入成绩
-        for index, row in df.iterrows():
-            student_name = str(row['姓名'])
-            score = row['成绩']
-
-            student = session.query(DbStudent).filter(DbStudent.name == student_name).first()
-            student_id = ''
-            if not student:
-                db_student = DbStudent(id=generate_uuid(), name=student_name, class_id=gradeImp.class_id,
-                                       created_time=datetime.now())
-                session.add(db_student)
-                student_id = db_student.id
-
-            grade = DbGrade(
-                id=generate_uuid(),
-                student_id=student.id if student else student_id,
-                class_id=gradeImp.class_id,
-                score=handle_nan(score),
-                year=gradeImp.year,
-                semester=gradeImp.semester,
-                exam=gradeImp.exam,
-                date=datetime.now()
-            )
-            session.add(grade)
+        semesters = semester_range(trend.start_year, trend.start_semester, trend.end_year, trend.end_semester)
+        if not semesters:
+            raise ValueError("Start semester is after end semester")
+        wanted = [previous_semester(*semesters[0])] + semesters
+
+        query = (
+            select(DbStudent.id, DbStudent.name, DbGrade.year, DbGrade.semester, DbGrade.exam, DbGrade.score)
+            .outerjoin(DbGrade, and_(DbGrade.student_id == DbStudent.id,
+                                     tuple_(DbGrade.year, DbGrade.semester).in_(wanted)))
+            .order_by(DbStudent.created_time, DbStudent.id)
+        )
+        if trend.student_ids:
+            query = query.where(DbStudent.id.in_(trend.student_ids))
+        else:
+            query = query.where(DbStudent.class_id == trend.class_id)
+
+        students = {}
+        for student_id, name, year, semester, exam, score in await session.execute(query):
+            student = students.setdefault(student_id, {"name": name, "scores": {}})
+            if year is not None:
+                student["scores"].setdefault((year, semester), {})[exam] = score
+
+        data = []
+        for student_id, student in students.items():
+            scores = student["scores"]
+            data.append({
+                "student_id": student_id,
+                "name": student["name"],
+                "semesters": [
+                    {
+                        "year": year,
+                        "semester": semester,
+                        "grades": fill_compare_slots(scores.get((year, semester), {}),
+                                                     scores.get(previous_semester(year, semester), {})),
+                    }
+                    for year, semester in semesters
+                ],
+            })
 
-        session.commit()
         return APIResponse(
             status=True,
-            data={},
+            data=data,
             message="Success",
             code=200
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get('/get-student-grades/{student_id}/{year}/{semester}', response_model=APIResponse)
-async def get_student_grades(student_id: str, year: str, semester: str):
-    session = get_db_session(engine)
-    try:
-        query = session.query(DbGrade).filter(
-            DbGrade.student_id == student_id,
-            DbGrade.year == year,
-            DbGrade.semester == semester
-        )
+async def get_student_grades(request: Request, response: Response, student_id: str, year: str, semester: str,
+                             slots: int = Query(EXAM_SLOTS, gt=0, le=20),
+                             session: AsyncSession = Depends(get_session)):
+    key = cache_key('grade:student', student_id=student_id, year=year, semester=semester, slots=slots)
+    not_modified = await check_not_modified(request, response, key, student_tags(student_id))
+    if not_modified:
+        return not_modified
+
+    cached = await query_cache.get(key)
+    if cached is not None:
+        return APIResponse(status=True, data=cached, message="Success", code=200)
+    versions = await query_cache.get_versions(student_tags(student_id))
 
-        # 查询结果
-        results = query.all()
-        data = [
-            StudentGradeModel(
-                score=grade.score,
-                exam=grade.exam,
+    try:
+        rows = await session.execute(
+            select(DbGrade.exam, DbGrade.score).filter(
+                DbGrade.student_id == student_id,
+                DbGrade.year == year,
+                DbGrade.semester == semester
             )
-            for grade in results
-        ]
-
-        data_len = len(data)
-        res = []
-        for i in range(4):
-            res.append(StudentGradeModel(
-                score=None,
-                exam=str(i + 1)
-            ))
-
-        if data_len != 4:
-            for item in res:
-                for item1 in data:
-                    if item.exam == item1.exam:
-                        item.score = item1.score
+        )
+        scores = {exam: score for exam, score in rows}
+        data = fill_slots(scores, slots)
 
+        await query_cache.set(key, data, tags=student_tags(student_id), versions=versions)
         return APIResponse(
             status=True,
-            data=res,
+            data=data,
             message="Success",
             code=200
         )
@@ -298,69 +551,38 @@ async def get_student_grades(student_id: str, year: str, semester: str):
 
 
 @router.get('/get-student-compare-grades/{student_id}/{year}/{semester}')
-async def get_student_compare_grades(student_id: str, year: str, semester: str):
-    session = get_db_session(engine)
-    try:
-        if semester == '1':
-            prev_semester = '2'
-            prev_year = str(int(year) - 1)
-        else:
-            prev_year = year
-            prev_semester = '1'
-
-        # 获取当前学期的成绩
-        current_grades = session.query(DbGrade).filter(
-            DbGrade.student_id == student_id,
-            DbGrade.year == year,
-            DbGrade.semester == semester
-        ).all()
-
-        current_data = [
-            StudentGradeModel(
-                score=grade.score,
-                exam=grade.exam
-            )
-            for grade in current_grades
-        ]
+async def get_student_compare_grades(request: Request, response: Response, student_id: str, year: str,
+                                     semester: str, slots: int = Query(EXAM_SLOTS, gt=0, le=20),
+                                     session: AsyncSession = Depends(get_session)):
+    key = cache_key('grade:student-compare', student_id=student_id, year=year, semester=semester, slots=slots)
+    not_modified = await check_not_modified(request, response, key, student_tags(student_id))
+    if not_modified:
+        return not_modified
+
+    cached = await query_cache.get(key)
+    if cached is not None:
+        return APIResponse(status=True, data=cached, message="Success", code=200)
+    versions = await query_cache.get_versions(student_tags(student_id))
 
-        # 上一个学期成绩查询
-        previous_grades = session.query(DbGrade).filter(
-            DbGrade.student_id == student_id,
-            DbGrade.year == prev_year,
-            DbGrade.semester == prev_semester
-        )
-
-        current_data_len = len(current_data)
+    try:
+        prev_year, prev_semester = previous_semester(year, semester)
 
-        previous_data = [
-            StudentGradeModel(
-                score=grade.score,
-                exam=grade.exam
+        # 当前学期和上一学期的成绩一次查出，按 (学年, 学期) 分桶
+        rows = await session.execute(
+            select(DbGrade.year, DbGrade.semester, DbGrade.exam, DbGrade.score).filter(
+                DbGrade.student_id == student_id,
+                tuple_(DbGrade.year, DbGrade.semester).in_([(year, semester), (prev_year, prev_semester)])
             )
-            for grade in previous_grades
-        ]
-
-        res = []
-        for i in range(4):
-            res.append(StudentGradeCompareModel(
-                current_score=None,
-                previous_score=None,
-                exam=str(i + 1)
-            ))
-
-        previous_data_len = len(previous_data)
-        if previous_data_len != 4 and current_data_len != 4:
-            for item in res:
-                for item1 in current_data:
-                    if item.exam == item1.exam:
-                        item.current_score = item1.score
-                for item2 in previous_data:
-                    if item.exam == item2.exam:
-                        item.previous_score = item2.score
+        )
+        buckets = {(year, semester): {}, (prev_year, prev_semester): {}}
+        for row_year, row_semester, exam, score in rows:
+            buckets[(row_year, row_semester)][exam] = score
+        data = fill_compare_slots(buckets[(year, semester)], buckets[(prev_year, prev_semester)], slots)
 
+        await query_cache.set(key, data, tags=student_tags(student_id), versions=versions)
         return APIResponse(
             status=True,
-            data=res,
+            data=data,
             message="Success",
             code=200
         )
@@ -1,14 +1,25 @@
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query
-from sqlalchemy import desc
-
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from common.cache import cache_key, class_tag, invalidate, query_cache
+from common.grade_summary import recompute_keys
+from common.http_cache import check_not_modified
+from common.json_response import api_response
+from common.name_index import student_name_index
+from common.pagination import count_cache, decode_cursor, encode_cursor, keyset_after
+from common.roster_import import import_roster, read_roster_names
+from common.student_resolver import student_resolver
 from common.tool import generate_uuid
-from db.db import Database, get_db_session
-from model.db_model import DbStudent, DbTbClass
+from common.upload_store import get_upload_path
+from db.db import get_session
+from model.db_model import DbGrade, DbStudent, DbTbClass
 from model.response import APIResponse
-from model.student_model import CreatStudentModel, StudentGradeResponse
+from model.student_model import CreatStudentModel, ImportRosterModel
 
 router = APIRouter(
     prefix="/student",
@@ -16,94 +27,113 @@ router = APIRouter(
     responses={404: {"description": "404 Not Found"}},
 )
 
-database = Database()
-engine = database.get_db_connection()
-
 
 @router.get("", response_model=APIResponse)
 async def get_students(
+        request: Request,
+        response: Response,
         class_id: Optional[str] = None,
         name: Optional[str] = None,
         page: int = Query(1, gt=0),
-        page_size: int = Query(10, gt=0, le=100)
+        page_size: int = Query(10, gt=0, le=100),
+        cursor: Optional[str] = None,
+        with_total: bool = True,
+        session: AsyncSession = Depends(get_session)
 ):
-    session = get_db_session(engine)
+    # 传入 cursor（首页传空字符串）时使用游标翻页
+    key = cache_key('student:list', class_id=class_id, name=name, page=page, page_size=page_size, cursor=cursor,
+                    with_total=with_total)
+    tags = [class_tag(class_id)]
+    not_modified = await check_not_modified(request, response, key, tags)
+    if not_modified:
+        return not_modified
+
+    cached = await query_cache.get(key)
+    if cached is not None:
+        return api_response(cached, response)
+    # 查询前记下标签版本，查询期间有写入时不缓存旧结果
+    versions = await query_cache.get_versions(tags)
+
     # 获取每个学生最新成绩的子查询
     try:
         # 创建一个别名来用于连接子查询
         query = (
-            session.query(
+            select(
                 DbStudent.id.label('student_id'),
                 DbStudent.name.label('student_name'),
                 DbTbClass.name.label('class_name'),
                 DbTbClass.id.label('class_id'),
+                DbStudent.created_time.label('created_time'),
             )
             .outerjoin(DbTbClass, DbStudent.class_id == DbTbClass.id)
-            .order_by(desc(DbStudent.created_time))  # 按时间倒序排序
+            .order_by(desc(DbStudent.created_time), desc(DbStudent.id))  # 按时间倒序排序
         )
 
         if class_id:
             query = query.filter(DbTbClass.id == class_id)
 
-        if name:
-            query = query.filter(DbStudent.name.ilike(f'%{name}%'))
-
-        total = query.count()
-
-        results = query.offset((page - 1) * page_size).limit(page_size).all()
-
+        # 通过内存姓名索引解析出学生 id，避免 LIKE '%name%' 全表扫描
+        name_condition = await student_name_index.filter_condition(session, name, DbStudent.id, class_id)
+        if name_condition is not None:
+            query = query.filter(name_condition)
+
+        total = None
+        if with_total:
+            count_query = select(func.count()).select_from(query.order_by(None).subquery())
+            # 游标翻页每页都带总数，短时间缓存；偏移翻页返回精确总数
+            if cursor is not None:
+                total = await count_cache.get(('student', class_id, name), lambda: session.scalar(count_query))
+            else:
+                total = await session.scalar(count_query)
+
+        if cursor is not None:
+            if cursor:
+                cursor_time, cursor_id = decode_cursor(cursor)
+                query = query.filter(keyset_after(DbStudent.created_time, DbStudent.id, cursor_time, cursor_id))
+            results = (await session.execute(query.limit(page_size))).all()
+        else:
+            results = (await session.execute(query.offset((page - 1) * page_size).limit(page_size))).all()
+
+        # 直接由结果行构造 dict，字段与 StudentGradeResponse 一致
         data = [
-            StudentGradeResponse(
-                id=student_id,
-                name=student_name,
-                class_name=class_name,
-                class_id=class_id,
-            )
-            for student_id, student_name, class_name, class_id in results
+            {
+                "id": row.student_id,
+                "name": row.student_name,
+                "class_name": row.class_name,
+                "class_id": row.class_id,
+            }
+            for row in results
         ]
 
-        return APIResponse(
-            status=True,
-            data={
-                "data": data,
-                "pagination": {
-                    "total_count": total,
-                    "page": page,
-                    "page_size": page_size,
-                }
-            },
-            message="Success",
-            code=200
-        )
-
+        pagination = {
+            "total_count": total,
+            "page": page,
+            "page_size": page_size,
+        }
+        if cursor is not None:
+            last = results[-1] if len(results) == page_size else None
+            pagination = {
+                "total_count": total,
+                "page_size": page_size,
+                "next_cursor": encode_cursor(last.created_time, last.student_id) if last else None,
+            }
+
+        result = {
+            "data": data,
+            "pagination": pagination
+        }
+        await query_cache.set(key, result, tags=tags, versions=versions)
+        return api_response(result, response)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("", response_model=APIResponse)
-async def create_student(student: CreatStudentModel):
-    session = get_db_session(engine)
+async def create_student(student: CreatStudentModel, session: AsyncSession = Depends(get_session)):
     try:
-        # listArr = ['王若宸', '翟嘉晟', '王梓宸', '宋恩硕', '李淼', '陈忠鹏', '葛君祥', '陈振宇', '王若杰', '邱海洋',
-        #            '潘星宇', '陈夏森', '叶峻熙', '王腾骏', '鲍俊熙', '朱锦鹏', '李佳蒴', '余子骞', '王子轩', '王艺泽',
-        #            '冯易博', '郭一鸣', '石天佑', '徐巳龙', '朱铭昊', '姚沁松', '朱博衍', '翁鸣宇', '李晨灏', '杨淼淼',
-        #            '沈昕', '董文萱', '汤心怡', '杨瑾玥', '汪姝伊', '卢宇芝', '穆梓晗', '王诗懿', '陈雅馨', '李梓妍',
-        #            '张可佳', '蔡欣桐']
-        #
-        # students_data = []
-        # createdTime = datetime.now()
-        # for x in range(len(listArr)):
-        #     students_data.append({
-        #         "id": generate_uuid(),
-        #         "name": listArr[x],
-        #         "class_id": student.class_id,
-        #         "created_time": createdTime,
-        #     })
-        #
-        # new_student = [
-        #     DbStudent(id=row['id'], name=row['name'], class_id=row['class_id'], created_time=row['created_time']) for
-        #     row in students_data]
-        # session.bulk_save_objects(new_student)
         # 判空处理
         if not student.name:
             raise HTTPException(status_code=400, detail="Student name cannot be empty")
@@ -114,7 +144,10 @@ async def create_student(student: CreatStudentModel):
         db_student = DbStudent(id=generate_uuid(), name=student.name, class_id=student.class_id,
                                created_time=datetime.now())
         session.add(db_student)
-        session.commit()
+        await session.commit()
+        student_name_index.add(db_student.id, db_student.name, db_student.class_id)
+        student_resolver.add(db_student.class_id, db_student.name, db_student.id)
+        await invalidate(class_ids=[db_student.class_id])
         return APIResponse(
             status=True,
             data={"id": ''},
@@ -122,20 +155,64 @@ async def create_student(student: CreatStudentModel):
             code=201
         )
     except Exception as e:
-        session.rollback()
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/import-roster", response_model=APIResponse)
+async def import_student_roster(roster: ImportRosterModel, session: AsyncSession = Depends(get_session)):
+    # 按上传的花名册批量创建学生，班级里已有的同名学生跳过
+    file_name = await get_upload_path(session, roster.file_id)
+    if not file_name:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not await session.get(DbTbClass, roster.class_id):
+        raise HTTPException(status_code=404, detail="Class not found")
+
+    try:
+        names = await run_in_threadpool(read_roster_names, file_name)
+        result = await import_roster(session, roster.class_id, names)
+        await session.commit()
+        for name, student_id in result["created"].items():
+            student_name_index.add(student_id, name, roster.class_id)
+            student_resolver.add(roster.class_id, name, student_id)
+        if result["created"]:
+            await invalidate(class_ids=[roster.class_id])
+        return APIResponse(
+            status=True,
+            data={
+                "created": [{"id": student_id, "name": name} for name, student_id in result["created"].items()],
+                "existing": result["existing"],
+            },
+            message="Roster imported successfully",
+            code=201
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/{student_id}", response_model=APIResponse)
-async def delete_student(student_id: str):
-    session = get_db_session(engine)
+async def delete_student(student_id: str, session: AsyncSession = Depends(get_session)):
     try:
-        db_student = session.query(DbStudent).filter_by(id=student_id).first()
+        db_student = await session.get(DbStudent, student_id)
         if not db_student:
             raise HTTPException(status_code=404, detail="Student not found")
 
-        session.delete(db_student)
-        session.commit()
+        # 学生的成绩会级联删除，删除后重新统计涉及的考试汇总
+        summary_keys = (await session.execute(
+            select(DbGrade.class_id, DbGrade.year, DbGrade.semester, DbGrade.exam)
+            .where(DbGrade.student_id == student_id).distinct()
+        )).all()
+        await session.delete(db_student)
+        await session.flush()
+        await recompute_keys(session, [tuple(key) for key in summary_keys])
+        await session.commit()
+        student_name_index.remove(student_id)
+        student_resolver.invalidate(db_student.class_id)
+        await invalidate(class_ids=[db_student.class_id] + [key.class_id for key in summary_keys],
+                         student_ids=[student_id])
         return APIResponse(
             status=True,
             data={},
@@ -144,21 +221,27 @@ async def delete_student(student_id: str):
         )
 
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{student_id}", response_model=APIResponse)
-async def update_student(student_id: str, student: CreatStudentModel):
-    session = get_db_session(engine)
+async def update_student(student_id: str, student: CreatStudentModel, session: AsyncSession = Depends(get_session)):
     try:
-        db_student = session.query(DbStudent).filter_by(id=student_id).first()
+        db_student = await session.get(DbStudent, student_id)
         if not db_student:
             raise HTTPException(status_code=404, detail="Student not found")
 
+        old_class_id = db_student.class_id
         db_student.name = student.name
         db_student.class_id = student.class_id
-        session.commit()
+        await session.commit()
+        student_name_index.add(db_student.id, db_student.name, db_student.class_id)
+        # 改名或转班后同名学生的归属可能变化，两个班级都重新加载
+        student_resolver.invalidate(old_class_id)
+        student_resolver.invalidate(db_student.class_id)
+        # 姓名会出现在成绩列表中，新旧班级的缓存都要失效
+        await invalidate(class_ids=[old_class_id, db_student.class_id], student_ids=[student_id])
         return APIResponse(
             status=True,
             data={},
@@ -166,5 +249,5 @@ async def update_student(student_id: str, student: CreatStudentModel):
             code=200
         )
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
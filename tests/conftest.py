@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 项目没有打包，测试按服务启动时的方式从仓库根目录导入 common、model 等模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,192 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from common import cache as cache_module  # noqa: E402
+from common.cache import LRUCache, RedisCache, etag_for  # noqa: E402
+from model.grade_model import StudentGradeModel  # noqa: E402
+
+
+class FakePipeline:
+
+    def __init__(self, client) -> None:
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return call
+
+    async def execute(self):
+        return [await getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    """只实现 RedisCache 用到的命令，值按 redis-py 的习惯以 bytes 返回"""
+
+    def __init__(self) -> None:
+        self.data = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(member.encode() for member in members)
+
+    async def expire(self, key, ttl):
+        return True
+
+    async def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def scan_iter(self, match):
+        prefix = match.rstrip('*')
+        for key in list(self.data):
+            if key.startswith(prefix):
+                yield key
+
+
+def test_lru_invalidate_tag_drops_only_tagged_keys():
+    async def scenario():
+        cache = LRUCache(maxsize=10, ttl=60)
+        await cache.set("a", 1, tags=["class:1"])
+        await cache.set("b", 2, tags=["class:2"])
+        await cache.invalidate_tags(["class:1"])
+        return await cache.get("a"), await cache.get("b"), cache.stats.invalidations
+
+    assert asyncio.run(scenario()) == (None, 2, 1)
+
+
+def test_lru_evicts_least_recently_used():
+    async def scenario():
+        cache = LRUCache(maxsize=2, ttl=60)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+    assert asyncio.run(scenario()) == (1, None, 3)
+
+
+def test_lru_versions_change_only_for_invalidated_tags():
+    async def scenario():
+        cache = LRUCache()
+        before = await cache.get_versions(["class:1", "class:2"])
+        await cache.invalidate_tags(["class:1"])
+        after = await cache.get_versions(["class:1", "class:2"])
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before[0] != after[0]
+    assert before[1] == after[1]
+
+
+def test_redis_stores_json_and_returns_plain_data():
+    client = FakeRedis()
+
+    async def scenario():
+        cache = RedisCache(client)
+        await cache.set("k", [StudentGradeModel(exam="1", score=90.5)], tags=["student:s1"])
+        return await cache.get("k")
+
+    assert asyncio.run(scenario()) == [{"exam": "1", "score": 90.5}]
+    assert json.loads(client.data["grade-cache:k"]) == [{"exam": "1", "score": 90.5}]
+
+
+def test_redis_treats_non_json_value_as_miss():
+    client = FakeRedis()
+    client.data["grade-cache:k"] = b"\x80\x04legacy"
+
+    async def scenario():
+        cache = RedisCache(client)
+        return await cache.get("k"), cache.stats.misses
+
+    assert asyncio.run(scenario()) == (None, 1)
+
+
+def test_redis_invalidate_tags_shared_across_instances():
+    client = FakeRedis()
+
+    async def scenario():
+        worker_a, worker_b = RedisCache(client), RedisCache(client)
+        await worker_a.set("k", {"x": 1}, tags=["class:1"])
+        before = await worker_b.get_versions(["class:1"])
+        await worker_b.invalidate_tags(["class:1"])
+        after = await worker_a.get_versions(["class:1"])
+        return before, after, await worker_a.get("k")
+
+    before, after, value = asyncio.run(scenario())
+    assert before != after
+    assert value is None
+
+
+def test_etag_changes_on_invalidate_and_after_ttl(monkeypatch):
+    monkeypatch.setattr(cache_module, "CACHE_TTL", 60)
+    monkeypatch.setattr(cache_module, "query_cache", LRUCache())
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+
+    async def scenario():
+        first = await etag_for("k", ["class:1"])
+        same = await etag_for("k", ["class:1"])
+        await cache_module.query_cache.invalidate_tags(["class:1"])
+        invalidated = await etag_for("k", ["class:1"])
+        now[0] += 60
+        expired = await etag_for("k", ["class:1"])
+        return first, same, invalidated, expired
+
+    first, same, invalidated, expired = asyncio.run(scenario())
+    assert first == same
+    assert len({first, invalidated, expired}) == 3
+
+
+def test_no_etag_without_cache_ttl(monkeypatch):
+    monkeypatch.setattr(cache_module, "CACHE_TTL", 0)
+    assert asyncio.run(etag_for("k", ["class:1"])) is None
+
+
+def test_lru_set_skipped_when_tag_invalidated_during_query():
+    async def scenario():
+        cache = LRUCache()
+        versions = await cache.get_versions(["class:1"])
+        await cache.invalidate_tags(["class:1"])
+        await cache.set("stale", 1, tags=["class:1"], versions=versions)
+        await cache.set("fresh", 2, tags=["class:1"], versions=await cache.get_versions(["class:1"]))
+        return await cache.get("stale"), await cache.get("fresh")
+
+    assert asyncio.run(scenario()) == (None, 2)
+
+
+def test_redis_set_skipped_when_tag_invalidated_during_query():
+    client = FakeRedis()
+
+    async def scenario():
+        cache = RedisCache(client)
+        versions = await cache.get_versions(["class:1"])
+        await RedisCache(client).invalidate_tags(["class:1"])
+        await cache.set("stale", 1, tags=["class:1"], versions=versions)
+        await cache.set("fresh", 2, tags=["class:1"], versions=await cache.get_versions(["class:1"]))
+        return await cache.get("stale"), await cache.get("fresh")
+
+    assert asyncio.run(scenario()) == (None, 2)
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("pydantic")
+
+from common.exam_slots import fill_compare_slots, fill_slots, previous_semester, semester_range  # noqa: E402
+
+
+def test_fill_slots_leaves_missing_exams_empty():
+    slots = fill_slots({"1": 90.0, "3": 72.5, "9": 60.0}, 4)
+    assert [(slot.exam, slot.score) for slot in slots] == [("1", 90.0), ("2", None), ("3", 72.5), ("4", None)]
+
+
+def test_fill_compare_slots():
+    slots = fill_compare_slots({"1": 80.0}, {"1": 70.0, "2": 65.0}, 3)
+    assert [(slot.exam, slot.current_score, slot.previous_score) for slot in slots] == [
+        ("1", 80.0, 70.0), ("2", None, 65.0), ("3", None, None)]
+
+
+def test_previous_semester():
+    assert previous_semester("2024", "1") == ("2023", "2")
+    assert previous_semester("2024", "2") == ("2024", "1")
+
+
+def test_semester_range():
+    assert semester_range("2023", "2", "2024", "2") == [("2023", "2"), ("2024", "1"), ("2024", "2")]
+    with pytest.raises(ValueError):
+        semester_range("2000", "1", "2024", "1")
@@ -0,0 +1,25 @@
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+pytest.importorskip("sqlalchemy.ext.asyncio")
+pytest.importorskip("aiomysql")
+
+from common import grade_export  # noqa: E402
+from common.grade_export import HEADER, _XlsxSheets  # noqa: E402
+
+
+def test_xlsx_rows_split_across_sheets(monkeypatch, tmp_path):
+    monkeypatch.setattr(grade_export, "XLSX_SHEET_ROWS", 3)
+    workbook = openpyxl.Workbook(write_only=True)
+    sheets = _XlsxSheets(workbook)
+    sheets.append_rows([[f"g{i}"] for i in range(4)])
+    sheets.append_rows([[f"g{i}"] for i in range(4, 7)])
+    path = tmp_path / "grades.xlsx"
+    workbook.save(path)
+
+    saved = openpyxl.load_workbook(path, read_only=True)
+    rows = [[list(row) for row in sheet.iter_rows(values_only=True)] for sheet in saved.worksheets]
+    assert saved.sheetnames == ["成绩", "成绩2", "成绩3"]
+    assert all(sheet_rows[0] == list(HEADER) for sheet_rows in rows)
+    assert [row[0] for sheet_rows in rows for row in sheet_rows[1:]] == [f"g{i}" for i in range(7)]
+    saved.close()
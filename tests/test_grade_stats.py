@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sqlalchemy.ext.asyncio")
+pytest.importorskip("aiomysql")
+
+from common.grade_stats import BAND_COUNT, BAND_EDGES, band_index  # noqa: E402
+from common.grade_summary import _estimate_median  # noqa: E402
+
+
+@pytest.mark.parametrize("score, expected", [
+    (0, 0), (9.9, 0), (10, 1), (59.9, 5), (60, 6), (99.9, 9), (100, 9), (120, 9), (-5, 0),
+])
+def test_band_index(score, expected):
+    assert band_index(score) == expected
+
+
+def test_band_index_matches_numpy_histogram():
+    scores = np.arange(0, 100.5, 0.5)
+    histogram, _ = np.histogram(scores, bins=BAND_EDGES)
+    assert np.bincount([band_index(score) for score in scores], minlength=BAND_COUNT).tolist() == histogram.tolist()
+
+
+def summary_row(scores):
+    buckets = [0] * BAND_COUNT
+    for score in scores:
+        buckets[band_index(score)] += 1
+    row = SimpleNamespace(score_count=len(scores), min_score=min(scores, default=None),
+                          max_score=max(scores, default=None))
+    return row, buckets
+
+
+def test_estimate_median_interpolates_within_band():
+    # 中位数落在 60-70 段，区间收窄到 [最低分 62, 段上界 70] 后插值
+    assert _estimate_median(*summary_row([62, 65, 68, 71])) == 67.33
+
+
+def test_estimate_median_single_score():
+    assert _estimate_median(*summary_row([85])) == 85
+
+
+def test_estimate_median_empty():
+    assert _estimate_median(*summary_row([])) is None
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("sqlalchemy.ext.asyncio")
+
+from common import name_index  # noqa: E402
+from common.name_index import StudentNameIndex  # noqa: E402
+from model.db_model import DbGrade  # noqa: E402
+
+
+def build_index() -> StudentNameIndex:
+    index = StudentNameIndex()
+    index.add("s1", "王若宸", "c1")
+    index.add("s2", "王小明", "c2")
+    index.add("s3", "李若宸", "c1")
+    index.add("s4", "Anna", "c1")
+    # 标记为已加载，search 不再访问数据库
+    index._loaded_at = time.monotonic()
+    return index
+
+
+def test_match_substring():
+    index = build_index()
+    assert sorted(index._match("若宸")) == ["s1", "s3"]
+    assert index._match("王小") == ["s2"]
+    assert index._match("张") == []
+
+
+def test_match_is_case_insensitive():
+    assert build_index()._match("aNN") == ["s4"]
+
+
+def test_blank_query_matches_nothing():
+    index = build_index()
+    assert index._match("") == []
+    assert index._match("   ") == []
+
+
+def test_removed_student_is_not_matched():
+    index = build_index()
+    index.remove("s1")
+    assert index._match("若宸") == ["s3"]
+
+
+@pytest.mark.skipif(name_index.lazy_pinyin is None, reason="pypinyin is not installed")
+def test_match_pinyin_initials():
+    assert build_index()._match("wrc") == ["s1"]
+
+
+def test_search_filters_by_class():
+    assert sorted(asyncio.run(build_index().search(None, "若宸", "c1"))) == ["s1", "s3"]
+    assert asyncio.run(build_index().search(None, "王", "c2")) == ["s2"]
+
+
+def test_filter_condition_skips_blank_query():
+    assert asyncio.run(build_index().filter_condition(None, "  ", DbGrade.student_id)) is None
+
+
+def test_filter_condition_uses_subquery_for_large_match(monkeypatch):
+    index = build_index()
+    condition = asyncio.run(index.filter_condition(None, "若宸", DbGrade.student_id))
+    assert "SELECT" not in str(condition)
+
+    monkeypatch.setattr(name_index, "NAME_FILTER_MAX_IDS", 1)
+    condition = asyncio.run(index.filter_condition(None, "若宸", DbGrade.student_id))
+    assert "SELECT student.id" in str(condition)
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+
+from common.pagination import CountCache, decode_cursor, encode_cursor, keyset_after  # noqa: E402
+
+
+def test_cursor_round_trip():
+    value = datetime(2024, 9, 1, 8, 30, 15)
+    assert decode_cursor(encode_cursor(value, "id-1")) == (value, "id-1")
+    assert decode_cursor(encode_cursor(None, "id-2")) == (None, "id-2")
+
+
+def test_decode_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_pages_cover_all_rows_in_order():
+    # SQLite 与 MySQL 一样倒序时 NULL 排在最后，可以直接验证翻页结果
+    metadata = sqlalchemy.MetaData()
+    table = sqlalchemy.Table(
+        "item", metadata,
+        sqlalchemy.Column("id", sqlalchemy.String, primary_key=True),
+        sqlalchemy.Column("date", sqlalchemy.DateTime, nullable=True),
+    )
+    rows = [
+        {"id": "a", "date": datetime(2024, 1, 1)},
+        {"id": "b", "date": datetime(2024, 1, 2)},
+        {"id": "c", "date": datetime(2024, 1, 2)},
+        {"id": "d", "date": None},
+        {"id": "e", "date": None},
+        {"id": "f", "date": datetime(2024, 1, 3)},
+    ]
+    engine = sqlalchemy.create_engine("sqlite://")
+    metadata.create_all(engine)
+    query = sqlalchemy.select(table.c.id, table.c.date).order_by(table.c.date.desc(), table.c.id.desc())
+    with engine.begin() as conn:
+        conn.execute(table.insert(), rows)
+        expected = [row.id for row in conn.execute(query)]
+
+        seen = []
+        cursor = None
+        while True:
+            page_query = query
+            if cursor:
+                page_query = query.where(keyset_after(table.c.date, table.c.id, *decode_cursor(cursor)))
+            page = conn.execute(page_query.limit(2)).all()
+            seen += [row.id for row in page]
+            if len(page) < 2:
+                break
+            cursor = encode_cursor(page[-1].date, page[-1].id)
+
+    assert expected == ["f", "c", "b", "a", "e", "d"]
+    assert seen == expected
+
+
+def test_count_cache_clear():
+    async def scenario():
+        cache = CountCache(ttl=60)
+        first = await cache.get("k", lambda: asyncio.sleep(0, 1))
+        cached = await cache.get("k", lambda: asyncio.sleep(0, 2))
+        cache.clear()
+        return first, cached, await cache.get("k", lambda: asyncio.sleep(0, 3))
+
+    assert asyncio.run(scenario()) == (1, 1, 3)
@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("sqlalchemy.ext.asyncio")
+pytest.importorskip("aiomysql")
+
+from common.profiling import statement_shape  # noqa: E402
+
+
+def test_in_lists_of_any_length_share_a_shape():
+    short = statement_shape("SELECT * FROM grade WHERE student_id IN (%s, %s)")
+    long = statement_shape("SELECT * FROM grade WHERE student_id IN (%s, %s, %s, %s)")
+    assert short == long == "SELECT * FROM grade WHERE student_id IN (...)"
+
+
+def test_literals_and_whitespace_are_normalized():
+    shape = statement_shape("SELECT  name\n  FROM student WHERE name = 'abc' AND score > 12.5 LIMIT 10")
+    assert shape == "SELECT name FROM student WHERE name = ? AND score > ? LIMIT ?"
+
+
+def test_identifiers_with_digits_are_kept():
+    assert statement_shape("SELECT bucket_0 FROM grade_summary") == "SELECT bucket_0 FROM grade_summary"
+
+
+def test_literal_in_list_collapses():
+    assert statement_shape("DELETE FROM grade WHERE id IN ('a', 'b', 3)") == "DELETE FROM grade WHERE id IN (...)"
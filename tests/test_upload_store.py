@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+
+import pytest
+
+pytest.importorskip("python_multipart")
+pytest.importorskip("openpyxl")
+pytest.importorskip("sqlalchemy.ext.asyncio")
+pytest.importorskip("aiomysql")
+
+# upload_store 导入时会创建上传目录，测试中指向临时目录
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp())
+
+from common.upload_store import UploadTooLargeError, UploadTypeError, _receive_upload  # noqa: E402
+
+BOUNDARY = "test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def multipart_body(file_name: str, content: bytes, field: str = "file") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="note"\r\n\r\n'
+        f"hello\r\n"
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{file_name}"\r\n'
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+class ChunkStream:
+    """按固定大小分块产出请求体，并记录被读取了多少"""
+
+    def __init__(self, body: bytes, chunk_size: int) -> None:
+        self.body = body
+        self.chunk_size = chunk_size
+        self.consumed = 0
+
+    async def __aiter__(self):
+        while self.consumed < len(self.body):
+            chunk = self.body[self.consumed:self.consumed + self.chunk_size]
+            self.consumed += len(chunk)
+            yield chunk
+
+
+def receive(stream, path, max_size=1024 * 1024, content_type=CONTENT_TYPE):
+    return asyncio.run(_receive_upload(stream, content_type, path, max_size))
+
+
+def test_streams_file_field_to_disk(tmp_path):
+    content = "姓名,成绩\n张三,90\n".encode() * 50
+    path = str(tmp_path / "upload.part")
+    upload, checksum = receive(ChunkStream(multipart_body("成绩.csv", content), 7), path)
+
+    assert (upload.file_name, upload.content_type, upload.size) == ("成绩.csv", "text/csv", len(content))
+    assert checksum == hashlib.sha256(content).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == content
+
+
+def test_rejects_extension_before_reading_file_data(tmp_path):
+    path = str(tmp_path / "upload.part")
+    stream = ChunkStream(multipart_body("tool.exe", b"x" * 100000), 64)
+    with pytest.raises(UploadTypeError):
+        receive(stream, path)
+    assert stream.consumed < 1024
+    assert not os.path.exists(path)
+
+
+def test_stops_reading_once_file_exceeds_limit(tmp_path):
+    path = str(tmp_path / "upload.part")
+    stream = ChunkStream(multipart_body("big.csv", b"1" * 100000), 64)
+    with pytest.raises(UploadTooLargeError):
+        receive(stream, path, max_size=1000)
+    assert stream.consumed < 2000
+    assert not os.path.exists(path)
+
+
+def test_rejects_excel_without_zip_signature(tmp_path):
+    with pytest.raises(UploadTypeError):
+        receive(ChunkStream(multipart_body("grades.xlsx", b"not a zip"), 16), str(tmp_path / "upload.part"))
+
+
+def test_requires_multipart_file_field(tmp_path):
+    path = str(tmp_path / "upload.part")
+    with pytest.raises(ValueError):
+        receive(ChunkStream(b"{}", 16), path, content_type="application/json")
+    with pytest.raises(ValueError):
+        receive(ChunkStream(multipart_body("a.csv", b"1", field="other"), 16), path)